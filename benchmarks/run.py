@@ -0,0 +1,202 @@
+"""
+离线端到端基准：合成站点 + 假模型，不访问真实网站和 Gemini。
+
+按规模（新闻源数量）依次测量：
+    fetch     Fetcher.fetch_from_sources（async / thread 两种模式）
+    bodies    Fetcher.fetch_bodies（下载文章页并抽取正文）
+    summarize Summarizer.batch_summarize（逐条 / 打包两种方式）
+    select    ArticleSelector.select_top_articles
+    save      save_items（写入临时 SQLite）
+    report    Reporter.generate（PDF / Markdown）
+
+结果写成 JSON，可与之前版本的结果对比：
+    python benchmarks/run.py --sizes 5,20,50 --out benchmarks/results/new.json
+    python benchmarks/run.py --compare benchmarks/results/old.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+
+def _configure_env(args, workdir: str):
+    """在导入 src 之前设置环境变量：假模型、临时数据库、关闭各类缓存和限流。"""
+    os.environ.update({
+        "LLM_PROVIDER": "fake",
+        "FAKE_LLM_LATENCY": str(args.llm_latency),
+        "LLM_RPM": "0",
+        "LLM_TPM": "0",
+        "DB_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "HTTP_CACHE_DIR": "",
+        "SUMMARY_CACHE": "0",
+        "METRICS_FILE": "",
+    })
+    sys.path.insert(0, str(ROOT))
+
+
+def _git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def _timed(fn, repeat: int):
+    """运行 repeat 次取中位数，返回 (秒数, 最后一次的结果)。"""
+    samples, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+
+def run_benchmarks(args, workdir: str) -> list:
+    from synthetic_site import SyntheticSite
+    from src.fetcher import Fetcher, get_parse_pool, parse_articles, DEFAULT_SELECTORS
+    from src.summarizer import Summarizer
+    from src.article_selector import ArticleSelector
+    from src.db import save_items, init_db
+    from src.reporter import Reporter
+    from src.llm import FakeChatModel
+
+    init_db()
+    results = []
+
+    # 预热：解析进程池启动、sklearn 导入、PDF 字体注册等一次性开销不计入结果
+    pool = get_parse_pool()
+    if pool is not None:
+        pool.submit(parse_articles, "<html></html>", "http://localhost/", DEFAULT_SELECTORS).result()
+    warm = [{"title": "预热 warmup", "summary": "预热", "link": "https://example.com/warmup"}] * 2
+    ArticleSelector(llm=FakeChatModel()).select_top_articles(warm, top_k=1, query="预热")
+    Reporter(os.path.join(workdir, "warmup.pdf")).generate("预热", {"其他": warm})
+
+    def record(stage, variant, size, items, seconds):
+        row = {
+            "stage": stage, "variant": variant, "size": size, "items": items,
+            "seconds": round(seconds, 4),
+            "items_per_sec": round(items / seconds, 2) if seconds > 0 else None,
+        }
+        results.append(row)
+        print(f"{stage:<10} {variant:<10} size={size:<5} items={items:<6} {seconds:8.3f}s")
+
+    with SyntheticSite() as site:
+        for size in args.sizes:
+            sources = site.sources(size, items=args.items_per_page, slow_every=args.slow_every,
+                                   slow_delay=args.slow_delay, huge_every=args.huge_every)
+
+            fetcher = Fetcher()
+            articles = []
+            for mode in ("async", "thread"):
+                seconds, articles = _timed(lambda: fetcher.fetch_from_sources(sources, mode=mode), args.repeat)
+                record("fetch", mode, size, len(articles), seconds)
+
+            # 超大页面会产生大量条目，后续阶段只取固定数量，保证不同版本之间可比
+            items = [dict(a) for a in articles[:size * args.items_per_page]]
+
+            seconds, filled = _timed(lambda: fetcher.fetch_bodies([dict(it) for it in items]), args.repeat)
+            record("bodies", "extract", size, len(items), seconds)
+
+            for variant, batch_size in (("single", 1), ("batch10", 10)):
+                summarizer = Summarizer(llm=FakeChatModel(latency=args.llm_latency))
+                seconds, summarized = _timed(
+                    lambda: summarizer.batch_summarize([dict(it) for it in items], batch_size=batch_size), args.repeat)
+                record("summarize", variant, size, len(summarized), seconds)
+
+            selector = ArticleSelector(llm=FakeChatModel(latency=args.llm_latency))
+            seconds, _ = _timed(lambda: selector.select_top_articles(items, top_k=7, query="机器人 芯片"), args.repeat)
+            record("select", "top7", size, len(items), seconds)
+
+            # 每次写入不同的链接，避免后几次全部命中唯一索引
+            runs = iter(range(args.repeat))
+            def save():
+                r = next(runs)
+                save_items([{**s, "link": f"{s.get('link')}#run{size}-{r}"} for s in summarized])
+            seconds, _ = _timed(save, args.repeat)
+            record("save", "sqlite", size, len(summarized), seconds)
+
+            grouped = {}
+            for it in summarized[:args.report_items]:
+                grouped.setdefault((it.get("categories") or ["其他"])[0], []).append(it)
+            count = sum(len(v) for v in grouped.values())
+            for ext in ("pdf", "md"):
+                path = os.path.join(workdir, f"report-{size}.{ext}")
+                seconds, _ = _timed(lambda: Reporter(path).generate("基准测试报告", grouped), args.repeat)
+                record("report", ext, size, count, seconds)
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> int:
+    """逐项对比耗时，任一项比基线慢 threshold 倍以上返回 1。"""
+    key = lambda r: (r["stage"], r["variant"], r["size"])
+    base = {key(r): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\n与基线 {baseline['meta'].get('revision')} 对比（阈值 {threshold:.2f}x）：")
+    for row in current["results"]:
+        old = base.get(key(row))
+        if not old or not old["seconds"]:
+            continue
+        ratio = row["seconds"] / old["seconds"]
+        flag = "REGRESSION" if ratio > threshold else ""
+        regressions += bool(flag)
+        print(f"{row['stage']:<10} {row['variant']:<10} size={row['size']:<5} "
+              f"{old['seconds']:8.3f}s -> {row['seconds']:8.3f}s  {ratio:5.2f}x {flag}")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="离线端到端基准")
+    parser.add_argument("--sizes", default="5,20,50", help="新闻源数量，逗号分隔")
+    parser.add_argument("--items-per-page", type=int, default=20)
+    parser.add_argument("--slow-every", type=int, default=10, help="每 N 个源有一个慢站点，0 为不生成")
+    parser.add_argument("--slow-delay", type=float, default=0.5)
+    parser.add_argument("--huge-every", type=int, default=20, help="每 N 个源有一个超大页面，0 为不生成")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="假模型每次调用的耗时（秒）")
+    parser.add_argument("--report-items", type=int, default=100, help="报告中最多包含的条目数")
+    parser.add_argument("--repeat", type=int, default=1, help="每项重复次数，取中位数")
+    parser.add_argument("--out", help="结果文件，默认 benchmarks/results/bench-<时间>.json")
+    parser.add_argument("--compare", help="基线结果文件")
+    parser.add_argument("--threshold", type=float, default=1.25, help="判定为退化的耗时倍数")
+    args = parser.parse_args()
+    args.sizes = [int(s) for s in args.sizes.split(",") if s]
+
+    with tempfile.TemporaryDirectory(prefix="news-bench-") as workdir:
+        _configure_env(args, workdir)
+        started = datetime.now(timezone.utc)
+        results = run_benchmarks(args, workdir)
+
+    report = {
+        "meta": {
+            "revision": _git_revision(),
+            "started_at": started.isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        },
+        "results": results,
+    }
+    out = Path(args.out) if args.out else RESULTS_DIR / f"bench-{started:%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n结果已写入 {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            return compare(report, json.load(f), args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+冷启动基准：在全新子进程中导入工具包，取多次运行的中位数。
+超出时间预算，或导入时就加载了重依赖，返回非零退出码，可直接放进 CI。
+
+用法：
+    python benchmarks/startup.py [--runs 5] [--budget 3.0] [--module src.tools.news_report_tool]
+预算也可以用环境变量 STARTUP_BUDGET 设置（秒）。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 这些模块只应在真正抓取/摘要/生成 PDF 时才导入
+HEAVY_MODULES = ["reportlab", "langchain_google_genai", "trafilatura", "sklearn", "sqlalchemy"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module: str, runs: int) -> dict:
+    env = dict(os.environ)
+    # 冷启动不应依赖 API key
+    env.pop("GOOGLE_API_KEY", None)
+    code = PROBE.format(module=module, heavy=HEAVY_MODULES)
+    samples, loaded = [], set()
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                             capture_output=True, text=True, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        samples.append(result["elapsed"])
+        loaded.update(result["loaded"])
+    return {
+        "module": module,
+        "runs": runs,
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "heavy_loaded": sorted(loaded),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="tools 包冷启动基准")
+    parser.add_argument("--module", default="src.tools.news_report_tool")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=float(os.getenv("STARTUP_BUDGET", 3.0)))
+    args = parser.parse_args()
+
+    result = measure(args.module, args.runs)
+    result["budget"] = args.budget
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+    if result["heavy_loaded"]:
+        print(f"FAIL: 导入 {args.module} 时加载了重依赖 {result['heavy_loaded']}", file=sys.stderr)
+        return 1
+    if result["median"] > args.budget:
+        print(f"FAIL: 冷启动中位数 {result['median']:.2f}s 超出预算 {args.budget:.2f}s", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
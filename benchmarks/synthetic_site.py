@@ -0,0 +1,196 @@
+"""
+本地合成新闻站点：按 news_sources.yaml 中各类 selectors 的结构生成列表页，
+用于离线基准测试，不访问真实网站。
+
+路径格式：/<shape>/<page>?items=20&delay=0&pad=0
+    shape: robot_report / bbc / generic，对应 SHAPES 中的 selectors
+    items: 每页文章数
+    delay: 响应前等待的秒数，模拟慢站点
+    pad:   额外填充的 KB 数，模拟超大页面
+列表页中的文章链接 /<shape>/<page>/article/<i> 返回带正文的详情页。
+robot_report 和 generic 的文章块带 <time datetime> 发布时间（第 i 条比第 0 条早 i 小时），bbc 没有。
+"""
+import html
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit, parse_qs
+
+SHAPES: Dict[str, Dict] = {
+    "robot_report": {
+        "selectors": {
+            "item": "article.type-post.entry.has-post-thumbnail",
+            "title": ".entry-title",
+            "summary": ".entry-content",
+            "link_attr": "a.entry-title-link[href]",
+        },
+        "template": '<article class="type-post entry has-post-thumbnail"><h2 class="entry-title">'
+                    '<a class="entry-title-link" href="{link}">{title}</a></h2>'
+                    '<p class="entry-meta"><time class="entry-time" datetime="{published}">{published}</time></p>'
+                    '<div class="entry-content"><p>{summary}</p></div></article>',
+    },
+    "bbc": {
+        "selectors": {
+            "item": 'div[data-testid="dundee-article"]',
+            "title": 'h2[data-testid="card-headline"]',
+            "summary": 'p[data-testid="card-description"]',
+            "link_attr": "a[href]",
+        },
+        "template": '<div data-testid="dundee-article"><h2 data-testid="card-headline"><a href="{link}">{title}</a></h2>'
+                    '<p data-testid="card-description">{summary}</p></div>',
+    },
+    "generic": {
+        "selectors": {
+            "item": "article, .post, .news-item, li, .entry",
+            "title": "h2, h3, a.title, .entry-title a",
+            "summary": "p, .summary, .desc",
+            "link_attr": "a",
+        },
+        "template": '<li class="news-item"><h3><a href="{link}">{title}</a></h3><p class="desc">{summary}</p>'
+                    '<time datetime="{published}">{published}</time></li>',
+    },
+}
+
+# 页面内容固定，发布时间也固定，不随当前时间变化
+PUBLISHED_BASE = datetime(2026, 10, 1, 12, 0, tzinfo=timezone.utc)
+_TOPICS = ["机器人", "人工智能", "芯片", "新能源", "自动驾驶", "robotics", "markets", "climate", "space", "health"]
+_WORDS = ("the of and to in for on with as by at from new report says market data model robot "
+          "公司 发布 市场 技术 研究 数据 政策 增长 全球 产品").split()
+
+
+def _text(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n))
+
+
+def render_page(shape: str, page: int, items: int, pad_kb: int = 0) -> str:
+    """同样的参数总是生成同样的页面，便于不同版本之间对比。"""
+    spec = SHAPES[shape]
+    rng = random.Random(f"{shape}/{page}")
+    parts = [f"<html><head><meta charset=\"utf-8\"><title>{shape} {page}</title></head><body>"]
+    if shape == "generic":
+        parts.append("<ul>")
+    for i in range(items):
+        topic = rng.choice(_TOPICS)
+        parts.append(spec["template"].format(
+            link=f"/{shape}/{page}/article/{i}",
+            title=html.escape(f"{topic} {page}-{i} {_text(rng, 6)}"),
+            summary=html.escape(f"{topic} {_text(rng, 40)}"),
+            published=(PUBLISHED_BASE - timedelta(hours=i)).isoformat(),
+        ))
+    if shape == "generic":
+        parts.append("</ul>")
+    if pad_kb:
+        # 页面中常见的脚本、导航等与正文无关的内容
+        filler = "<div class=\"nav\">" + "x" * 1000 + "</div>"
+        parts.append(filler * pad_kb)
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def render_article(shape: str, page: int, index: int, paragraphs: int = 12) -> str:
+    rng = random.Random(f"{shape}/{page}/{index}")
+    topic = rng.choice(_TOPICS)
+    body = "".join(f"<p>{html.escape(topic + ' ' + _text(rng, 60))}。</p>" for _ in range(paragraphs))
+    nav = '<a href="/">nav</a>' * 20
+    return (f'<html><head><meta charset="utf-8"><title>{topic} {page}-{index}</title></head><body>'
+            f"<nav>{nav}</nav><article><h1>{topic} {page}-{index}</h1>{body}</article>"
+            f"<footer>footer</footer></body></html>")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        segments = [s for s in parts.path.split("/") if s]
+        query = parse_qs(parts.query)
+        if len(segments) < 2 or segments[0] not in SHAPES:
+            self.send_error(404)
+            return
+        delay = float(query.get("delay", ["0"])[0])
+        if delay:
+            time.sleep(delay)
+        try:
+            page = int(segments[1])
+        except ValueError:
+            page = 0
+        if len(segments) == 4 and segments[2] == "article":
+            body = render_article(segments[0], page, int(segments[3])).encode("utf-8")
+        else:
+            body = render_page(segments[0], page, int(query.get("items", ["20"])[0]),
+                               int(query.get("pad", ["0"])[0])).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class SyntheticSite:
+    """在后台线程中运行的本地站点：with SyntheticSite() as site: site.sources(50)"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "SyntheticSite":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="synthetic-site", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def sources(self, count: int, items: int = 20, slow_every: int = 10, slow_delay: float = 0.5,
+                huge_every: int = 20, huge_items: int = 500, huge_pad_kb: int = 1024) -> List[Dict]:
+        """
+        生成 count 个新闻源配置，结构与 news_sources.yaml 一致。
+        每 slow_every 个源中有一个慢站点，每 huge_every 个源中有一个超大页面（0 表示不生成）。
+        """
+        shapes = list(SHAPES)
+        sources = []
+        for i in range(count):
+            shape = shapes[i % len(shapes)]
+            n, delay, pad = items, 0.0, 0
+            if slow_every and i % slow_every == slow_every - 1:
+                delay = slow_delay
+            if huge_every and i % huge_every == huge_every - 1:
+                n, pad = huge_items, huge_pad_kb
+            sources.append({
+                "url": f"{self.base_url}/{shape}/{i}?items={n}&delay={delay:g}&pad={pad}",
+                "name": f"Synthetic {shape} {i}",
+                "tags": ["合成", shape],
+                "config": {"encoding": "utf-8", "selectors": SHAPES[shape]["selectors"]},
+            })
+        return sources
+
+
+if __name__ == "__main__":
+    with SyntheticSite() as site:
+        print(f"合成站点运行于 {site.base_url}，Ctrl+C 退出")
+        for s in site.sources(3):
+            print(s["url"])
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -1,10 +1,15 @@
 from .fetcher import Fetcher
-from .cleaner import clean_text
+from .pipeline import StreamingPipeline, prepare_item
 from .summarizer import Summarizer
 from .db import save_items
 from .reporter import Reporter
 from collections import defaultdict
+from .dedup import dedup_items
+from .seen import filter_incremental, commit_incremental
+from .config import settings
+from typing import Optional
 from .utils import log
+from .metrics import dump_run_metrics
 
 class Agent:
     def __init__(self, sources: list, reporter_out: str = "report.pdf"):
@@ -13,26 +18,37 @@ class Agent:
         self.summarizer = Summarizer()
         self.reporter = Reporter(reporter_out)
 
-    def run(self):
-        log.info("开始抓取新闻源...")
+    def _run_batch(self, incremental: bool):
         raw = self.fetcher.fetch_from_sources(self.sources)
-        items = []
-        for r in raw:
-            text = r.get('text') or r.get('summary') or ''
-            text = clean_text(text)
-            items.append({
-                'title': r.get('title') or '',
-                'link': r.get('link'),
-                'published': r.get('published'),
-                'source': r.get('source'),
-                'text': text
-            })
+        items = [prepare_item(r) for r in raw]
+        items, _ = dedup_items(items)
+        if incremental:
+            items, _ = filter_incremental(items)
+        if settings.full_text:
+            self.fetcher.fetch_bodies(items)
         log.info(f"共抓取 {len(items)} 条，开始摘要...")
         items = self.summarizer.batch_summarize(items)
         save_items(items)
+        if incremental:
+            commit_incremental(items, [s["url"] for s in self.sources])
+        return items
+
+    def run(self, incremental: Optional[bool] = None, streaming: Optional[bool] = None):
+        """
+        incremental: 只处理之前运行中没见过的链接，默认取 settings.incremental
+        streaming: 使用流式管道，抓取、摘要、入库重叠进行，默认取 settings.pipeline_streaming
+        """
+        incremental = settings.incremental if incremental is None else incremental
+        streaming = settings.pipeline_streaming if streaming is None else streaming
+        log.info("开始抓取新闻源...")
+        if streaming:
+            items = StreamingPipeline(self.fetcher, self.summarizer, incremental).run(self.sources)
+        else:
+            items = self._run_batch(incremental)
         grouped = defaultdict(list)
         for it in items:
             grouped[it.get('source', '其他')].append(it)
         title = "热点新闻汇总"
         self.reporter.generate(title, grouped)
         log.info("报告已生成")
+        dump_run_metrics()
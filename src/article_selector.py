@@ -1,9 +1,10 @@
-from typing import List
-from langchain_core.messages import HumanMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
+from typing import Dict, List, Optional
 from .tools.BaseModel import Article
 import json
 from .config import settings
+from .llm import ModelCascade, get_rate_limiter, invoke_llm, llm_breaker_key
+from .ranker import rank_articles
+from .utils import retry, estimate_tokens
 import re
 
 
@@ -17,41 +18,67 @@ def extract_json_block(text: str):
     return text.strip()
 
 class ArticleSelector:
-    def __init__(self, model: str = "gemini-2.5-pro"):
+    def __init__(self, model: Optional[str] = None, llm=None, fast_model: Optional[str] = None, fast_llm=None):
         """
-        :param model_name: LLM 模型名称
-        :param api_key: OpenAI API key
+        :param model: 强模型名称，默认 settings.llm_strong_model
+        :param llm: 可选，直接注入的聊天模型（如 llm.FakeChatModel），用于离线测试
+        :param fast_model / fast_llm: 级联中的快模型，默认 settings.llm_fast_model
         """
-        self.model = ChatGoogleGenerativeAI(
-            model=model,
-            google_api_key=settings.google_api_key,
-            temperature=0.2,
-            max_output_tokens=4096,
-        )
+        self.cascade = ModelCascade("select", model, fast_model, llm=llm, fast_llm=fast_llm,
+                                    temperature=0.2, max_output_tokens=4096)
+        self.limiter = get_rate_limiter()
         
-    def select_top_articles(self, articles: List[Article], top_k: int = 5) -> List[Article]:
+    @retry(times=3, delay=2, deadline=settings.llm_deadline, breaker_key=llm_breaker_key)
+    def _invoke(self, model, prompt: str, model_name: str = ""):
+        prompt_tokens = estimate_tokens(prompt)
+        self.limiter.acquire(prompt_tokens + 64)
+        return invoke_llm(model, prompt, "select", prompt_tokens, model_name)
+
+    def select_top_articles(self, articles: List[Article], top_k: int = 5, query: Optional[str] = None,
+                            source_weights: Optional[Dict[str, float]] = None) -> List[Article]:
         """
         从文章列表中挑选出最重要的 top_k 条，按重要性排序。
+        先在本地按相关度、时效性和来源权重打分，只把前 settings.selector_candidates 条交给 LLM；
+        LLM 失败或返回不足 top_k 条时，用本地排序补齐。
         """
         if top_k > 7:
             top_k = 7  # 限制最多选择 7 条
+        ranked = rank_articles(articles, query, source_weights)
+        candidates = ranked[:settings.selector_candidates]
+
         prompt = "你是新闻助手，请从下面新闻中挑选出最重要的{}条，按重要性从高到低排序。只返回每条新闻的索引，不要删除或修改字段。\n\n".format(top_k)
-        for i, a in enumerate(articles):
-            prompt += f"{i}: 标题：{a['title']}\n"
+        for i, idx in enumerate(candidates):
+            prompt += f"{i}: 标题：{articles[idx]['title']}\n"
 
         prompt += "\n请返回 JSON 数组，例如：[0,3,2,1,4]"
 
-        try:
-            response = self.model.invoke([HumanMessage(content=prompt)])
+        def parse(response) -> List[int]:
             content = response.content.strip()
             # 去除可能的代码块标记
             cleaned_content = extract_json_block(content)
-            # 提取 JSON 部分
-            top_indices= json.loads(cleaned_content)
+            # 提取 JSON 部分，并映射回原始索引
+            picked = []
+            for i in json.loads(cleaned_content):
+                if isinstance(i, int) and 0 <= i < len(candidates) and candidates[i] not in picked:
+                    picked.append(candidates[i])
+            if not picked:
+                raise ValueError("no valid index in reply")
+            return picked
+
+        top_indices = []
+        try:
+            # 先用快模型，回复无效时用强模型
+            top_indices = self.cascade.run(lambda model, name: self._invoke(model, prompt, model_name=name),
+                                           parse, estimate_tokens(prompt))
         except Exception:
-            # 如果解析失败，直接返回前 top_k 条
-            print("Warning: 解析文章选择结果失败，返回前 {} 条。".format(top_k))
-            top_indices = list(range(min(top_k, len(articles))))
+            # 如果解析失败，使用本地排序
+            print("Warning: 解析文章选择结果失败，按本地排序返回前 {} 条。".format(top_k))
+
+        for idx in ranked:
+            if len(top_indices) >= top_k:
+                break
+            if idx not in top_indices:
+                top_indices.append(idx)
 
         # 返回 Article 对象
         return [articles[i] for i in top_indices[:top_k]]
@@ -0,0 +1,105 @@
+import re
+from functools import lru_cache
+from typing import List, NamedTuple
+
+from .utils import estimate_tokens
+
+# 中文句末标点后直接断句，英文句号等后面需跟空白
+_SENTENCE_END = re.compile(r"(?<=[。！？!?；])|(?<=[.;])\s+")
+# TextRank 的阻尼系数和迭代次数
+DAMPING = 0.85
+ITERATIONS = 30
+
+
+class Compressed(NamedTuple):
+    text: str
+    original_tokens: int
+    tokens: int
+
+    @property
+    def compressed(self) -> bool:
+        return self.tokens < self.original_tokens
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_END.split(text) if s and s.strip()]
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """按 token 估算截断单个过长的句子。"""
+    if estimate_tokens(text) <= budget:
+        return text
+    cut = max(1, len(text) * budget // max(1, estimate_tokens(text)))
+    while cut > 1 and estimate_tokens(text[:cut]) > budget:
+        cut = cut * 9 // 10
+    return text[:cut].rstrip() + "…"
+
+
+def textrank(sentences: List[str]) -> List[float]:
+    """
+    句子的 TextRank 得分：以 TF-IDF 字符 n-gram 的余弦相似度为边权，迭代计算 PageRank。
+    与 ranker 一样用字符 n-gram，中英文都不需要分词。
+    """
+    import numpy as np
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    n = len(sentences)
+    try:
+        matrix = TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 3), sublinear_tf=True).fit_transform(sentences)
+    except ValueError:
+        return [1.0] * n
+    sim = (matrix @ matrix.T).toarray()
+    np.fill_diagonal(sim, 0.0)
+    row_sums = sim.sum(axis=1, keepdims=True)
+    # 与其他句子都不相似的句子均匀地指向所有句子
+    weights = np.divide(sim, row_sums, out=np.full_like(sim, 1.0 / n), where=row_sums > 0)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(ITERATIONS):
+        scores = (1 - DAMPING) / n + DAMPING * (weights.T @ scores)
+    return scores.tolist()
+
+
+def _select(sentences: List[str], order: List[int], budget: int) -> List[int]:
+    """按 order 的优先级挑选放得进预算的句子，返回它们在原文中的下标（按原文顺序）。"""
+    chosen, used = [], 0
+    for i in order:
+        cost = estimate_tokens(sentences[i]) + 1
+        if used + cost <= budget:
+            chosen.append(i)
+            used += cost
+    return sorted(chosen)
+
+
+@lru_cache(maxsize=1024)
+def fit_to_budget(text: str, budget: int, method: str = "textrank") -> Compressed:
+    """
+    原文估算超过 budget 个 token 时在本地做抽取式压缩，保留的句子按原文顺序拼接：
+    - lead：从头取句子直到放不下（新闻的关键信息通常在开头）
+    - textrank：首句必选，其余按 TextRank 得分从高到低取
+    只有一句或首句本身就超出预算时，直接按 token 截断。
+    method 为 none 时只做截断。
+    """
+    original = estimate_tokens(text)
+    if original <= budget or budget <= 0:
+        return Compressed(text, original, original)
+
+    # 重复的句子（导航、版权声明等）只保留第一次出现
+    sentences = list(dict.fromkeys(split_sentences(text))) if method in ("lead", "textrank") else [text]
+    if len(sentences) <= 1 or estimate_tokens(sentences[0]) >= budget:
+        out = truncate_to_tokens(sentences[0] if sentences else text, budget)
+        return Compressed(out, original, estimate_tokens(out))
+
+    order = list(range(len(sentences)))
+    if method == "textrank" and len(sentences) > 2:
+        scores = textrank(sentences)
+        order = [0] + sorted(order[1:], key=lambda i: -scores[i])
+    out = " ".join(sentences[i] for i in _select(sentences, order, budget))
+    return Compressed(out, original, estimate_tokens(out))
+
+
+if __name__ == "__main__":
+    sample = ("机器人公司周二发布了新一代协作机械臂，负载提升到 20 公斤。" * 3
+              + "该公司表示，新产品将首先面向汽车和电子制造客户。分析师认为协作机器人市场今年将增长 30%。" * 20)
+    for m in ("lead", "textrank"):
+        res = fit_to_budget(sample, 120, m)
+        print(m, res.original_tokens, "->", res.tokens, res.text[:80])
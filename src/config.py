@@ -8,6 +8,118 @@ class Settings(BaseSettings):
     google_api_key: str | None = os.getenv("GOOGLE_API_KEY")
     default_language: str = os.getenv("DEFAULT_LANGUAGE", "zh")
     db_url: str = os.getenv("DB_URL", "sqlite:///news_agent.db")
+    # 重复链接入库时 ignore（跳过）或 update（覆盖）
+    db_on_conflict: str = os.getenv("DB_ON_CONFLICT", "ignore")
+    # 仅在 sqlite:/// 时生效
+    sqlite_wal: bool = os.getenv("SQLITE_WAL", "1") == "1"
+    sqlite_synchronous: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    sqlite_cache_kb: int = int(os.getenv("SQLITE_CACHE_KB", "65536"))
     user_agent: str = os.getenv("USER_AGENT", "news-agent-bot/1.0")
 
+    # 抓取并发：thread 为线程池模式，async 为 asyncio + 连接池模式
+    fetch_mode: str = os.getenv("FETCH_MODE", "async")
+    fetch_concurrency: int = int(os.getenv("FETCH_CONCURRENCY", "20"))
+    fetch_per_host: int = int(os.getenv("FETCH_PER_HOST", "4"))
+    fetch_deadline: float = float(os.getenv("FETCH_DEADLINE", "30"))
+    # 列表页响应体最多读取的字节数，超出部分丢弃（只解析前面部分）
+    fetch_max_bytes: int = int(os.getenv("FETCH_MAX_BYTES", str(5 * 1024 * 1024)))
+
+    # 列表页解析器：lxml（预编译选择器，快）或 bs4（兼容模式）
+    html_extractor: str = os.getenv("HTML_EXTRACTOR", "lxml")
+    # 解析进程池大小（与网络并发分开设置），0 表示在抓取线程内解析；
+    # 小于 PARSE_OFFLOAD_BYTES 的页面仍就地解析，避免进程间传输开销
+    parse_workers: int = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+    parse_offload_bytes: int = int(os.getenv("PARSE_OFFLOAD_BYTES", str(64 * 1024)))
+
+    # 重试与熔断：连续失败 BREAKER_FAILURES 次后熔断，BREAKER_RESET 秒后半开试探
+    breaker_failures: int = int(os.getenv("BREAKER_FAILURES", "5"))
+    breaker_reset: float = float(os.getenv("BREAKER_RESET", "60"))
+    llm_deadline: float = float(os.getenv("LLM_DEADLINE", "120"))
+
+    # LLM 调用：provider 为 google 或 fake（离线假模型），并发与 rpm/tpm 限流（0 表示不限）
+    llm_provider: str = os.getenv("LLM_PROVIDER", "google")
+    llm_concurrency: int = int(os.getenv("LLM_CONCURRENCY", "8"))
+    llm_rpm: float = float(os.getenv("LLM_RPM", "60"))
+    llm_tpm: float = float(os.getenv("LLM_TPM", "1000000"))
+    fake_llm_latency: float = float(os.getenv("FAKE_LLM_LATENCY", "0.5"))
+    # 模型级联：摘要、分类、挑选和对话先用快模型，回复无效、调用失败或输入超过 LLM_ESCALATE_TOKENS 时用强模型
+    llm_cascade: bool = os.getenv("LLM_CASCADE", "1") == "1"
+    llm_fast_model: str = os.getenv("LLM_FAST_MODEL", "gemini-2.5-flash")
+    llm_strong_model: str = os.getenv("LLM_STRONG_MODEL", "gemini-2.5-pro")
+    llm_escalate_tokens: int = int(os.getenv("LLM_ESCALATE_TOKENS", "6000"))
+
+    # 摘要打包：每个请求最多 SUMMARY_BATCH_SIZE 条、输入不超过 SUMMARY_BATCH_TOKENS，1 表示逐条摘要
+    summary_batch_size: int = int(os.getenv("SUMMARY_BATCH_SIZE", "1"))
+    summary_batch_tokens: int = int(os.getenv("SUMMARY_BATCH_TOKENS", "6000"))
+    # 每篇原文送给模型的 token 上限（估算），超出时先在本地用 textrank / lead 抽取句子，none 为直接截断
+    summary_input_tokens: int = int(os.getenv("SUMMARY_INPUT_TOKENS", "1500"))
+    summary_compression: str = os.getenv("SUMMARY_COMPRESSION", "textrank")
+    # 提示词改动时递增，旧版本的摘要缓存随之失效
+    prompt_version: str = os.getenv("PROMPT_VERSION", "v3")
+
+    # 增量模式：只处理 news 表中没有的链接，并按来源的发布时间水位过滤
+    incremental: bool = os.getenv("INCREMENTAL", "0") == "1"
+
+    # 流式管道：各阶段之间队列容量 PIPELINE_BUFFER，每批摘要 / 入库 PIPELINE_CHUNK 条
+    pipeline_streaming: bool = os.getenv("PIPELINE_STREAMING", "0") == "1"
+    pipeline_buffer: int = int(os.getenv("PIPELINE_BUFFER", "32"))
+    pipeline_chunk: int = int(os.getenv("PIPELINE_CHUNK", "16"))
+
+    # 批量渲染报告的进程数
+    render_workers: int = int(os.getenv("RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+    # 文章挑选：本地预排序后只把前 SELECTOR_CANDIDATES 条交给 LLM
+    selector_candidates: int = int(os.getenv("SELECTOR_CANDIDATES", "30"))
+
+    # 摘要缓存（存放在 db_url 对应数据库的 summary_cache 表）
+    summary_cache: bool = os.getenv("SUMMARY_CACHE", "1") == "1"
+    summary_cache_ttl: int = int(os.getenv("SUMMARY_CACHE_TTL", str(7 * 24 * 3600)))
+    summary_cache_max: int = int(os.getenv("SUMMARY_CACHE_MAX", "50000"))
+
+    # 列表页条件请求缓存，HTTP_CACHE_DIR 置空即关闭
+    http_cache_dir: str = os.getenv("HTTP_CACHE_DIR", ".cache/http")
+    http_cache_max_entries: int = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "2000"))
+    http_cache_max_mb: int = int(os.getenv("HTTP_CACHE_MAX_MB", "200"))
+    http_cache_max_age: int = int(os.getenv("HTTP_CACHE_MAX_AGE", str(3 * 24 * 3600)))
+
+    # 每次运行结束时把各阶段指标写成 JSON，置空则不写
+    metrics_file: str = os.getenv("METRICS_FILE", "")
+
+    # HTTP 服务（python -m src.server）
+    server_host: str = os.getenv("SERVER_HOST", "0.0.0.0")
+    server_port: int = int(os.getenv("SERVER_PORT", "9000"))
+    # 同时执行的报告任务数、排队上限（超出返回 429）、保留的已完成任务数
+    server_workers: int = int(os.getenv("SERVER_WORKERS", "2"))
+    server_queue_size: int = int(os.getenv("SERVER_QUEUE_SIZE", "16"))
+    server_job_history: int = int(os.getenv("SERVER_JOB_HISTORY", "200"))
+    # 同时进行的对话数
+    chat_concurrency: int = int(os.getenv("CHAT_CONCURRENCY", "4"))
+    # 服务生成的报告存放目录
+    report_dir: str = os.getenv("REPORT_DIR", "reports")
+
+    # 正文抓取：为挑选出的新闻下载文章页并抽取正文，摘要基于正文而不是列表页片段
+    full_text: bool = os.getenv("FULL_TEXT", "0") == "1"
+    article_concurrency: int = int(os.getenv("ARTICLE_CONCURRENCY", "16"))
+    article_per_host: int = int(os.getenv("ARTICLE_PER_HOST", "2"))
+    article_max_bytes: int = int(os.getenv("ARTICLE_MAX_BYTES", str(1024 * 1024)))
+    article_max_chars: int = int(os.getenv("ARTICLE_MAX_CHARS", "20000"))
+    article_timeout: float = float(os.getenv("ARTICLE_TIMEOUT", "10"))
+    article_deadline: float = float(os.getenv("ARTICLE_DEADLINE", "30"))
+
+    # news_report 结果缓存：相同新闻源集合 + top_k + 语言的请求在 REPORT_CACHE_TTL 秒内直接复用，0 为只合并并发请求
+    report_cache_ttl: int = int(os.getenv("REPORT_CACHE_TTL", "600"))
+    report_cache_max: int = int(os.getenv("REPORT_CACHE_MAX", "64"))
+
+    # 定时抓取（python -m src.scheduler）：每个源的轮询间隔（秒）在 [MIN, MAX] 之间自适应，
+    # 抓到新链接时乘以 SPEEDUP 缩短，没有新链接时乘以 BACKOFF 延长，YAML 中的 poll 配置优先
+    scheduler_interval: float = float(os.getenv("SCHEDULER_INTERVAL", "1800"))
+    scheduler_min_interval: float = float(os.getenv("SCHEDULER_MIN_INTERVAL", "300"))
+    scheduler_max_interval: float = float(os.getenv("SCHEDULER_MAX_INTERVAL", str(6 * 3600)))
+    scheduler_speedup: float = float(os.getenv("SCHEDULER_SPEEDUP", "0.5"))
+    scheduler_backoff: float = float(os.getenv("SCHEDULER_BACKOFF", "1.5"))
+    # 下次抓取时间在间隔的 ±JITTER 比例内随机浮动，避免所有源同时触发
+    scheduler_jitter: float = float(os.getenv("SCHEDULER_JITTER", "0.1"))
+    # 一次最多抓取的到期源数量
+    scheduler_batch: int = int(os.getenv("SCHEDULER_BATCH", "20"))
+
 settings = Settings()
@@ -1,37 +1,280 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import (create_engine, event, inspect, insert, text, Column, Integer, String, Text, DateTime,
+                        Float, select, delete, func as sa_func)
 from sqlalchemy.orm import declarative_base, sessionmaker
 from sqlalchemy.sql import func
 from .config import settings
+from .dedup import canonicalize_url
+from .utils import log
+from . import metrics
 
 Base = declarative_base()
 engine = create_engine(settings.db_url, echo=False, future=True)
 SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
 
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_conn, _):
+        # WAL 允许读写并发；synchronous=NORMAL 在 WAL 下仍然安全且少很多 fsync
+        cur = dbapi_conn.cursor()
+        if settings.sqlite_wal:
+            cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cur.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_kb}")
+        cur.execute("PRAGMA temp_store=MEMORY")
+        cur.close()
+
 class News(Base):
     __tablename__ = "news"
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(1024))
     link = Column(String(2048))
     published = Column(String(128), nullable=True)
-    source = Column(String(256), nullable=True)
+    source = Column(String(256), nullable=True, index=True)
     text = Column(Text, nullable=True)
     summary = Column(Text, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    # 规范化链接的哈希，唯一约束保证重复抓取不会重复入库
+    link_hash = Column(String(64), nullable=True, unique=True, index=True)
+
+class SummaryCache(Base):
+    """摘要缓存：key 由链接、内容哈希、模型、语言和 prompt 版本组成。"""
+    __tablename__ = "summary_cache"
+    key = Column(String(64), primary_key=True)
+    summary = Column(Text)
+    categories = Column(Text)  # JSON 数组
+    created_at = Column(Float, index=True)
+    accessed_at = Column(Float, index=True)
+
+class SourceState(Base):
+    """
+    每个新闻源的增量抓取水位：上次运行时间和已见过的最新发布时间；
+    以及定时抓取（scheduler）的状态：当前轮询间隔、下次抓取时间、上次抓到的新条目数。
+    """
+    __tablename__ = "source_state"
+    source = Column(String(256), primary_key=True)
+    last_run_at = Column(Float, nullable=True)
+    last_published = Column(Float, nullable=True)
+    poll_interval = Column(Float, nullable=True)
+    next_poll_at = Column(Float, nullable=True)
+    last_new = Column(Integer, nullable=True)
+
+_initialized = False
+_init_lock = threading.RLock()
+
+def link_hash(item: dict) -> str:
+    """规范化链接的 sha256；没有链接时退回到 来源 + 标题。"""
+    link = item.get("canonical_link") or canonicalize_url(item.get("link") or "")
+    key = link or f"{item.get('source') or ''}|{item.get('title') or ''}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+def _migrate_news():
+    """
+    旧库的 news 表没有 link_hash 列和索引，create_all 不会修改已有表，这里补齐：
+    加列、回填哈希、删除重复链接，再建索引。
+    重复链接保留哪一条与 settings.db_on_conflict 一致：ignore 保留最早入库的一条，update 保留最新的一条。
+    """
+    columns = {c["name"] for c in inspect(engine).get_columns("news")}
+    if "link_hash" not in columns:
+        keep_newest = settings.db_on_conflict == "update"
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE news ADD COLUMN link_hash VARCHAR(64)"))
+            order = News.id.desc() if keep_newest else News.id
+            rows = conn.execute(select(News.id, News.link, News.title, News.source).order_by(order)).all()
+            seen, dup_ids, updates = set(), [], []
+            for row in rows:
+                h = link_hash({"link": row.link, "title": row.title, "source": row.source})
+                if h in seen:
+                    dup_ids.append(row.id)
+                else:
+                    seen.add(h)
+                    updates.append({"row_id": row.id, "h": h})
+            if dup_ids:
+                conn.execute(delete(News).where(News.id.in_(dup_ids)))
+            if updates:
+                conn.execute(text("UPDATE news SET link_hash = :h WHERE id = :row_id"), updates)
+        log.info(f"news 表迁移：回填 {len(updates)} 条 link_hash，删除 {len(dup_ids)} 条重复链接"
+                 f"（保留{'最新' if keep_newest else '最早'}的一条）")
+    for index in News.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+def _add_missing_columns(model):
+    """给已有表补上模型中新增的列（只支持可为空的列）。"""
+    table = model.__table__
+    columns = {c["name"] for c in inspect(engine).get_columns(table.name)}
+    missing = [c for c in table.columns if c.name not in columns]
+    if not missing:
+        return
+    with engine.begin() as conn:
+        for col in missing:
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(dialect=engine.dialect)}"))
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    """建表并迁移旧库；加锁，服务和线程里并发的首次调用只有一个执行 ALTER TABLE / CREATE INDEX。"""
+    global _initialized
+    with _init_lock:
+        Base.metadata.create_all(bind=engine)
+        _migrate_news()
+        _add_missing_columns(SourceState)
+        _initialized = True
+
+def _ensure_db():
+    if _initialized:
+        return
+    with _init_lock:
+        if not _initialized:
+            init_db()
+
+def _insert_stmt():
+    """按数据库方言构造遇到重复 link_hash 时跳过或更新的 INSERT。"""
+    table = News.__table__
+    dialect = engine.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        if settings.db_on_conflict == "update":
+            return stmt.on_conflict_do_update(
+                index_elements=["link_hash"],
+                set_={c: stmt.excluded[c] for c in ("title", "link", "published", "source", "text", "summary")},
+            )
+        return stmt.on_conflict_do_nothing(index_elements=["link_hash"])
+    if dialect == "mysql":
+        return insert(table).prefix_with("IGNORE")
+    return insert(table)
 
 def save_items(items: list):
-    db = SessionLocal()
+    """
+    批量写入新闻：Core INSERT + executemany，一个事务提交。
+    以规范化链接的哈希去重，已存在的链接按 settings.db_on_conflict 跳过（ignore）或更新（update）。
+    """
+    _ensure_db()
+    rows = {}
     for it in items:
-        n = News(
-            title=it.get("title"),
-            link=it.get("link"),
-            published=it.get("published"),
-            source=it.get("source"),
-            text=it.get("text"),
-            summary=it.get("summary_generated") or it.get("summary")
-        )
-        db.add(n)
-    db.commit()
-    db.close()
+        h = link_hash(it)
+        rows[h] = {
+            "title": it.get("title"),
+            "link": it.get("link"),
+            "published": it.get("published"),
+            "source": it.get("source"),
+            "text": it.get("text"),
+            "summary": it.get("summary_generated") or it.get("summary"),
+            "link_hash": h,
+        }
+    if not rows:
+        return
+    with metrics.DB_WRITE_SECONDS.time():
+        with engine.begin() as conn:
+            conn.execute(_insert_stmt(), list(rows.values()))
+    metrics.DB_ROWS.inc(len(rows))
+
+def iter_link_hashes(chunk: int = 10000) -> Iterable[str]:
+    """流式读取所有已入库新闻的 link_hash。"""
+    _ensure_db()
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(
+            select(News.link_hash).where(News.link_hash.is_not(None)))
+        for part in result.partitions(chunk):
+            for (h,) in part:
+                yield h
+
+def count_news() -> int:
+    _ensure_db()
+    with engine.connect() as conn:
+        return conn.execute(select(sa_func.count()).select_from(News)).scalar()
+
+def existing_link_hashes(hashes: Iterable[str]) -> set:
+    """返回 hashes 中已经存在于 news 表的部分。"""
+    hashes = list(set(hashes))
+    found = set()
+    if not hashes:
+        return found
+    _ensure_db()
+    with engine.connect() as conn:
+        for i in range(0, len(hashes), 500):
+            found.update(conn.execute(select(News.link_hash).where(News.link_hash.in_(hashes[i:i + 500]))).scalars())
+    return found
+
+def get_watermarks(sources: Iterable[str]) -> Dict[str, SourceState]:
+    sources = list(set(sources))
+    if not sources:
+        return {}
+    _ensure_db()
+    with SessionLocal() as db:
+        rows = db.execute(select(SourceState).where(SourceState.source.in_(sources))).scalars()
+        return {row.source: row for row in rows}
+
+def update_watermarks(latest: Dict[str, float], run_at: float):
+    """latest: {source: 本次新条目中最新的发布时间戳}，没有发布时间的源只更新 last_run_at。"""
+    if not latest:
+        return
+    _ensure_db()
+    with SessionLocal() as db:
+        for source, published in latest.items():
+            row = db.get(SourceState, source) or SourceState(source=source)
+            row.last_run_at = run_at
+            if published and (row.last_published is None or published > row.last_published):
+                row.last_published = published
+            db.merge(row)
+        db.commit()
+
+def get_all_source_states() -> Dict[str, SourceState]:
+    _ensure_db()
+    with SessionLocal() as db:
+        return {row.source: row for row in db.execute(select(SourceState)).scalars()}
+
+def update_schedules(schedules: Dict[str, Tuple[float, float, int]]):
+    """schedules: {source: (轮询间隔, 下次抓取时间, 本次新条目数)}"""
+    if not schedules:
+        return
+    _ensure_db()
+    with SessionLocal() as db:
+        for source, (interval, next_poll_at, new) in schedules.items():
+            row = db.get(SourceState, source) or SourceState(source=source)
+            row.poll_interval = interval
+            row.next_poll_at = next_poll_at
+            row.last_new = new
+            db.merge(row)
+        db.commit()
+
+def get_cached_summaries(keys: Iterable[str]) -> Dict[str, Tuple[str, List[str]]]:
+    """批量读取未过期的摘要缓存，并刷新命中条目的访问时间（LRU）。"""
+    keys = list(set(keys))
+    if not keys:
+        return {}
+    _ensure_db()
+    now = time.time()
+    out = {}
+    with SessionLocal() as db:
+        for i in range(0, len(keys), 500):
+            rows = db.execute(select(SummaryCache).where(SummaryCache.key.in_(keys[i:i + 500]))).scalars()
+            for row in rows:
+                if now - row.created_at > settings.summary_cache_ttl:
+                    continue
+                row.accessed_at = now
+                out[row.key] = (row.summary, json.loads(row.categories))
+        db.commit()
+    return out
+
+def put_cached_summaries(entries: Dict[str, Tuple[str, List[str]]]):
+    """写入摘要缓存，随后淘汰过期条目，并按访问时间裁剪到 summary_cache_max 条。"""
+    if not entries:
+        return
+    _ensure_db()
+    now = time.time()
+    with SessionLocal() as db:
+        for key, (summary, categories) in entries.items():
+            db.merge(SummaryCache(key=key, summary=summary, categories=json.dumps(categories, ensure_ascii=False),
+                                  created_at=now, accessed_at=now))
+        db.execute(delete(SummaryCache).where(SummaryCache.created_at < now - settings.summary_cache_ttl))
+        overflow = db.execute(select(sa_func.count()).select_from(SummaryCache)).scalar() - settings.summary_cache_max
+        if overflow > 0:
+            oldest = select(SummaryCache.key).order_by(SummaryCache.accessed_at).limit(overflow)
+            db.execute(delete(SummaryCache).where(SummaryCache.key.in_(oldest)))
+        db.commit()
@@ -0,0 +1,130 @@
+import re
+import hashlib
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from .utils import log
+
+# 常见的跟踪参数，规范化时去掉
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "spm", "from", "ref", "ref_src", "share", "cmpid", "ocid", "at_medium", "at_campaign",
+}
+_DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    规范化链接，用于判重和缓存 key：
+    - scheme/域名小写，去掉 www. 前缀和默认端口
+    - 去掉 #fragment、utm_* 及常见跟踪参数，其余参数按名称排序
+    - 去掉路径末尾多余的 /
+    非 http(s) 链接（"#"、"javascript:"、相对路径等）不能区分文章，返回空字符串；
+    端口等无法解析的链接原样返回。
+    """
+    url = (url or "").strip()
+    if not url:
+        return ""
+    try:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or "").rstrip(".")
+        port = parts.port
+    except ValueError:
+        return url
+    if scheme not in _DEFAULT_PORTS or not host:
+        return ""
+    if host.startswith("www."):
+        host = host[4:]
+    # IPv6 地址需要保留方括号
+    netloc = f"[{host}]" if ":" in host else host
+    if port and str(port) != _DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
+
+
+_WORD = re.compile(r"[a-z0-9]+")
+_CJK_RUN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+")
+
+
+def _features(text: str) -> List[str]:
+    """英文按单词，中日韩文本按相邻两字切分。"""
+    text = text.lower()
+    feats = _WORD.findall(text)
+    for run in _CJK_RUN.findall(text):
+        feats.extend(run[i:i + 2] for i in range(max(1, len(run) - 1)))
+    return feats
+
+
+def simhash(text: str, bits: int = 64) -> int:
+    weights = [0] * bits
+    for feat in _features(text):
+        h = int.from_bytes(hashlib.blake2b(feat.encode("utf-8"), digest_size=8).digest(), "big")
+        for i in range(bits):
+            weights[i] += 1 if h >> i & 1 else -1
+    return sum(1 << i for i, w in enumerate(weights) if w > 0)
+
+
+class Deduplicator:
+    """
+    有状态的去重器，可以在流式管道中逐条判断：
+    1. 规范化后的 link 相同的只保留第一条；规范化结果存入 canonical_link，link 保持原样
+    2. 对 title + summary（或 text）计算 SimHash，海明距离不超过 max_distance 视为同一新闻；
+       64 位按 4 段各 16 位分桶，距离 ≤ 3 时至少有一段完全相同，只需比较同桶条目
+    特征过少的短文本不做近似判重，避免误伤。
+    """
+
+    def __init__(self, max_distance: int = 3, min_features: int = 4):
+        self.max_distance = max_distance
+        self.min_features = min_features
+        self.seen_links = set()
+        self.buckets: Dict[Tuple[int, int], List[int]] = {}
+        self.link_dups = 0
+        self.near_dups = 0
+
+    @property
+    def dropped(self) -> int:
+        return self.link_dups + self.near_dups
+
+    def accept(self, it: Dict) -> bool:
+        link = canonicalize_url(it.get("link") or "")
+        if link:
+            it["canonical_link"] = link
+            if link in self.seen_links:
+                self.link_dups += 1
+                return False
+
+        text = f"{it.get('title') or ''} {it.get('summary') or it.get('text') or ''}"
+        if len(_features(text)) >= self.min_features:
+            h = simhash(text)
+            bands = [(b, h >> (16 * b) & 0xFFFF) for b in range(4)]
+            if any(bin(h ^ other).count("1") <= self.max_distance
+                   for band in bands for other in self.buckets.get(band, ())):
+                self.near_dups += 1
+                return False
+            for band in bands:
+                self.buckets.setdefault(band, []).append(h)
+
+        if link:
+            self.seen_links.add(link)
+        return True
+
+    def report(self, total: int):
+        if self.dropped:
+            log.info(f"去重：输入 {total} 条，丢弃 {self.dropped} 条（链接重复 {self.link_dups}，近似重复 {self.near_dups}）")
+
+
+def dedup_items(items: List[Dict], max_distance: int = 3, min_features: int = 4) -> Tuple[List[Dict], int]:
+    """在摘要之前去重，返回 (保留的条目, 丢弃的数量)，规则见 Deduplicator。"""
+    dedup = Deduplicator(max_distance, min_features)
+    kept = [it for it in items if dedup.accept(it)]
+    dedup.report(len(items))
+    return kept, dedup.dropped
@@ -0,0 +1,195 @@
+from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import urljoin
+import lxml.html
+from lxml import etree
+from cssselect import HTMLTranslator, SelectorError
+from bs4 import BeautifulSoup
+from .ranker import parse_published
+from .utils import log
+
+# bs4 的 get_text 不包含 script/style/template 中的文本，lxml 路径需要保持一致
+_TEXT = etree.XPath(
+    "descendant-or-self::text()[not(ancestor::script) and not(ancestor::style) and not(ancestor::template)]"
+)
+_TRANSLATOR = HTMLTranslator()
+_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+# 文章块中的发布时间，selectors 中没有配置 published 时使用；取 datetime 属性，没有时取文本
+DEFAULT_PUBLISHED = "time"
+
+
+def _published(value: Optional[str]) -> Optional[str]:
+    """规范成带时区的 ISO 8601 字符串，"2 小时前" 之类无法解析的写法忽略。"""
+    dt = parse_published(value.strip()) if value else None
+    return dt.isoformat() if dt else None
+
+
+def _make_item(title: str, summary: str, link: str, url: str, published: Optional[str] = None) -> Optional[Dict]:
+    # 若 link 是相对路径，则拼接成完整 URL
+    if link and link.startswith("/"):
+        link = urljoin(url, link)
+    if not title:
+        return None
+    item = {
+        "title": title,
+        "summary": summary,
+        "link": link,
+        "source": url
+    }
+    published = _published(published)
+    if published:
+        item["published"] = published
+    return item
+
+
+class SoupExtractor:
+    """BeautifulSoup 实现，兼容 soupsieve 支持的全部选择器语法。"""
+    name = "bs4"
+
+    def extract(self, html: str, url: str, selectors: Dict) -> Tuple[List[Dict], Optional[str]]:
+        """返回 (文章列表, 页面 <title>)。"""
+        soup = BeautifulSoup(html, "lxml")
+
+        results = []
+        for item in soup.select(selectors["item"]):
+            title_tag = item.select_one(selectors["title"])
+            summary_tag = item.select_one(selectors["summary"])
+
+            title = title_tag.get_text(strip=True) if title_tag else ""
+            summary = summary_tag.get_text(strip=True) if summary_tag else ""
+            link_tag = title_tag.select_one(selectors["link_attr"]) if title_tag else None
+            link = link_tag["href"] if link_tag and link_tag.has_attr("href") else ""
+            time_tag = item.select_one(selectors.get("published") or DEFAULT_PUBLISHED)
+            published = (time_tag.get("datetime") or time_tag.get_text(strip=True)) if time_tag else None
+
+            article = _make_item(title, summary, link, url, published)
+            if article:
+                results.append(article)
+
+        page_title = soup.title.string if soup.title else None
+        return results, str(page_title) if page_title is not None else None
+
+
+# cssselect 对这些写法的语义与 bs4（soupsieve）不同，结果会不一致，交给 bs4 处理
+_BS4_ONLY = (":scope",)
+
+
+@lru_cache(maxsize=1024)
+def compile_selector(css: str, prefix: str = "descendant::") -> etree.XPath:
+    """
+    把 CSS 选择器编译成 XPath 并缓存，同一个源的选择器只编译一次。
+    默认使用 descendant:: 前缀，与 bs4 的 select/select_one 只匹配后代的语义一致；
+    文章块选择器从文档节点开始匹配（prefix="//"），与 soup.select 一样可以选中 <html> 本身。
+    """
+    return etree.XPath(_TRANSLATOR.css_to_xpath(css, prefix=prefix))
+
+
+def _text(el) -> str:
+    return "".join(s.strip() for s in _TEXT(el))
+
+
+class LxmlExtractor:
+    """lxml + 预编译 XPath 的快速实现，不构建 bs4 对象树。"""
+    name = "lxml"
+
+    def extract(self, html: str, url: str, selectors: Dict) -> Tuple[List[Dict], Optional[str]]:
+        item_sel = compile_selector(selectors["item"], "//")
+        title_sel = compile_selector(selectors["title"])
+        summary_sel = compile_selector(selectors["summary"])
+        link_sel = compile_selector(selectors["link_attr"])
+        time_sel = compile_selector(selectors.get("published") or DEFAULT_PUBLISHED)
+
+        try:
+            root = lxml.html.document_fromstring(html.encode("utf-8"), parser=_PARSER)
+        except (etree.ParserError, ValueError):
+            return [], None
+
+        results = []
+        for item in item_sel(root.getroottree()):
+            title_tags = title_sel(item)
+            summary_tags = summary_sel(item)
+            title_tag = title_tags[0] if title_tags else None
+
+            title = _text(title_tag) if title_tag is not None else ""
+            summary = _text(summary_tags[0]) if summary_tags else ""
+            link_tags = link_sel(title_tag) if title_tag is not None else []
+            link = (link_tags[0].get("href") or "") if link_tags else ""
+            time_tags = time_sel(item)
+            published = (time_tags[0].get("datetime") or _text(time_tags[0])) if time_tags else None
+
+            article = _make_item(title, summary, link, url, published)
+            if article:
+                results.append(article)
+
+        page_title = None
+        title_el = root.find(".//title")
+        if title_el is not None and len(title_el) == 0 and title_el.text is not None:
+            page_title = str(title_el.text)
+        return results, page_title
+
+
+EXTRACTORS = {
+    "lxml": LxmlExtractor(),
+    "bs4": SoupExtractor(),
+}
+
+
+@lru_cache(maxsize=1024)
+def _lxml_supports(selectors: Tuple[str, ...]) -> bool:
+    """一组选择器能否交给 lxml，结果按选择器缓存，不支持的只警告一次。"""
+    try:
+        for css in selectors:
+            if any(token in css for token in _BS4_ONLY):
+                raise SelectorError(f"{css!r} behaves differently in cssselect")
+            compile_selector(css)
+    except SelectorError as e:
+        log.warning(f"Selector not supported by lxml, falling back to bs4: {e}")
+        return False
+    return True
+
+
+def get_extractor(name: str, selectors: Dict):
+    """
+    按名称返回解析器；lxml 无法编译或语义与 bs4 不同的选择器（如 :scope）回退到 bs4。
+    """
+    extractor = EXTRACTORS.get(name, EXTRACTORS["bs4"])
+    if extractor.name == "lxml" and not _lxml_supports((
+            selectors["item"], selectors["title"], selectors["summary"], selectors["link_attr"],
+            selectors.get("published") or DEFAULT_PUBLISHED)):
+        return EXTRACTORS["bs4"]
+    return extractor
+
+
+def compare_engines(html: str, url: str, selectors: Dict) -> List[Tuple]:
+    """返回两种解析器结果中 (title, summary, link) 不一致的条目，空列表表示一致。"""
+    fast, fast_title = EXTRACTORS["lxml"].extract(html, url, selectors)
+    slow, slow_title = EXTRACTORS["bs4"].extract(html, url, selectors)
+    triples = lambda rs: [(r["title"], r["summary"], r["link"], r.get("published")) for r in rs]
+    diffs = [(a, b) for a, b in zip(triples(fast), triples(slow)) if a != b]
+    if len(fast) != len(slow):
+        diffs.append(("count", len(fast), len(slow)))
+    if fast_title != slow_title:
+        diffs.append(("page_title", fast_title, slow_title))
+    return diffs
+
+
+if __name__ == "__main__":
+    # 在保存的页面样本上校验 lxml 与 bs4 两种解析器结果一致
+    import yaml
+
+    fixtures_dir = Path(__file__).parent / "asset" / "fixtures"
+    with open(fixtures_dir / "fixtures.yaml", "r", encoding="utf-8") as f:
+        fixtures = yaml.safe_load(f)
+
+    failed = 0
+    for fx in fixtures:
+        html = (fixtures_dir / fx["file"]).read_text(encoding="utf-8")
+        diffs = compare_engines(html, fx["url"], fx["selectors"])
+        count = len(EXTRACTORS["lxml"].extract(html, fx["url"], fx["selectors"])[0])
+        status = "OK" if not diffs else "MISMATCH"
+        print(f"[{status}] {fx['file']}: {count} 条")
+        for d in diffs:
+            print("   ", d)
+        failed += bool(diffs)
+    raise SystemExit(1 if failed else 0)
@@ -1,22 +1,280 @@
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, AsyncIterator, Iterator, Tuple
+import asyncio
+import atexit
+import multiprocessing
+import queue
+import threading
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+import httpx
 import trafilatura
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from .config import settings
+from .http_cache import HttpCache
+from .http_body import Page, UnacceptableResponse, check_content_type, decode_body, read_capped, aread_capped
+from .extractor import get_extractor
 from .utils import retry, log
+from . import metrics
 import logging
 
 log = logging.getLogger(__name__)
 
 HEADERS = {"User-Agent": settings.user_agent}
 
+DEFAULT_SELECTORS = {
+    "item": "article, .post, .news-item, li, .entry",
+    "title": "h2, h3, a.title, .entry-title a",
+    "summary": "p, .summary, .desc",
+    "link_attr": "href"
+}
+
+
+def parse_articles(html: str, url: str, selectors: Dict, engine: Optional[str] = None) -> List[Dict]:
+    """
+    从列表页 HTML 中解析出文章块，同步和异步两种抓取模式共用。
+    engine: "lxml"（默认，预编译选择器）或 "bs4"（兼容模式），默认取 settings.html_extractor
+    """
+    # 语义与 bs4 不同或无法编译的选择器由 get_extractor 直接交给 bs4，没有匹配的页面不再重新解析
+    extractor = get_extractor(engine or settings.html_extractor, selectors)
+    results, page_title = extractor.extract(html, url, selectors)
+
+    # 如果没提取出结果，则使用 trafilatura 尝试提取全文
+    if not results:
+        extracted = trafilatura.extract(html)
+        if extracted:
+            results = [{
+                "title": page_title or "",
+                "summary": extracted[:500],
+                "link": url,
+                "source": url
+            }]
+
+    return results
+
+
+def extract_body(html: str, url: str) -> Optional[str]:
+    """从文章详情页中抽取正文，和 parse_articles 一样可以在解析进程池中运行。"""
+    return trafilatura.extract(html, url=url, include_comments=False, include_tables=False, favor_precision=True)
+
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    进程内共享的解析进程池，首次需要时才创建。
+    使用 spawn 启动，避免在已有线程和事件循环的进程里 fork。
+    """
+    global _parse_pool
+    if settings.parse_workers <= 0:
+        return None
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=settings.parse_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            atexit.register(_parse_pool.shutdown, cancel_futures=True)
+        return _parse_pool
+
+
+def _use_pool(html: str) -> Optional[ProcessPoolExecutor]:
+    return get_parse_pool() if len(html) >= settings.parse_offload_bytes else None
+
+
+def _host_key(self, *args, **kwargs) -> str:
+    """熔断器按域名划分，取参数中第一个 URL 的 netloc。"""
+    url = next(a for a in args if isinstance(a, str))
+    return urlparse(url).netloc
+
 
 class Fetcher:
-    def __init__(self):
-        pass
+    def __init__(self, concurrency: Optional[int] = None, per_host: Optional[int] = None,
+                 cache: Optional[HttpCache] = None):
+        """
+        :param concurrency: 全局最大并发请求数，默认取 settings.fetch_concurrency
+        :param per_host: 单个域名的最大并发请求数，默认取 settings.fetch_per_host
+        :param cache: 列表页响应缓存，默认按 settings.http_cache_dir 创建，为空则不缓存
+        """
+        self.concurrency = concurrency or settings.fetch_concurrency
+        self.per_host = per_host or settings.fetch_per_host
+        if cache is None and settings.http_cache_dir:
+            cache = HttpCache()
+        self.cache = cache
+
+        # 共享 Session，复用 keep-alive 连接，避免每次请求都重新握手
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # async 模式共用一个常驻事件循环线程和 httpx.AsyncClient，连接池在多次调用（多个服务请求）之间复用
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(target=loop.run_forever, name="fetcher-loop", daemon=True)
+                self._loop_thread.start()
+                self._loop = loop
+            return self._loop
+
+    def _run(self, coro):
+        """在常驻事件循环中执行协程并等待结果（供同步接口调用）。"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result()
+
+    @asynccontextmanager
+    async def _client_ctx(self):
+        """在常驻事件循环中返回共享的 client；调用方在自己的事件循环里时临时创建一个。"""
+        if asyncio.get_running_loop() is not self._loop:
+            async with self._new_client() as client:
+                yield client
+            return
+        if self._client is None:
+            self._client = self._new_client()
+        yield self._client
+
+    def _new_client(self) -> httpx.AsyncClient:
+        size = max(self.concurrency, settings.article_concurrency)
+        limits = httpx.Limits(max_connections=size, max_keepalive_connections=size)
+        return httpx.AsyncClient(headers=HEADERS, limits=limits, follow_redirects=True)
+
+    def close(self):
+        """关闭共享的 client、事件循环线程和 Session。"""
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            if self._client is not None:
+                asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result()
+                self._client = None
+            loop.call_soon_threadsafe(loop.stop)
+            self._loop_thread.join()
+            loop.close()
+        self.session.close()
+
+    def _parse(self, html: str, url: str, selectors: Dict, engine: Optional[str]) -> List[Dict]:
+        """大页面交给解析进程池，只把精简后的结果 dict 传回来。"""
+        pool = _use_pool(html)
+        with metrics.PARSE_SECONDS.time(source=url):
+            if pool is None:
+                return parse_articles(html, url, selectors, engine)
+            return pool.submit(parse_articles, html, url, selectors, engine).result()
+
+    async def _aparse(self, html: str, url: str, selectors: Dict, engine: Optional[str]) -> List[Dict]:
+        pool = _use_pool(html)
+        with metrics.PARSE_SECONDS.time(source=url):
+            if pool is None:
+                # 解析是 CPU 密集操作，放到线程里避免阻塞事件循环
+                return await asyncio.to_thread(parse_articles, html, url, selectors, engine)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(pool, parse_articles, html, url, selectors, engine)
+
+    def _cache_lookup(self, url: str, config: Dict, headers: Dict) -> Tuple[Optional[str], Optional[Dict], Dict]:
+        """查缓存并在请求头中带上 If-None-Match / If-Modified-Since。"""
+        if not self.cache:
+            return None, None, headers
+        key = HttpCache.make_key(url, config)
+        entry = self.cache.get(key)
+        if entry:
+            headers = {**headers, **HttpCache.conditional_headers(entry)}
+        return key, entry, headers
+
+    def _cache_hit(self, key: Optional[str], entry: Optional[Dict], status: int, resp_headers, content: bytes) -> Optional[List[Dict]]:
+        """304 或响应体哈希未变时返回缓存的文章列表，否则返回 None。"""
+        if not entry:
+            return None
+        if status == 304:
+            self.cache.touch(key)
+            return entry["articles"]
+        if status == 200:
+            body_hash = HttpCache.body_hash(content)
+            if body_hash == entry.get("body_hash"):
+                # 内容没变但校验器可能更新了，顺手刷新
+                self.cache.put(key, resp_headers.get("ETag"), resp_headers.get("Last-Modified"), body_hash, entry["articles"])
+                return entry["articles"]
+        return None
+
+    def _cache_store(self, key: Optional[str], resp_headers, content: bytes, articles: List[Dict]):
+        if self.cache and key:
+            self.cache.put(key, resp_headers.get("ETag"), resp_headers.get("Last-Modified"),
+                           HttpCache.body_hash(content), articles)
+
+    @staticmethod
+    def _record(url: str, start: float, status, content: bytes = b""):
+        host = urlparse(url).netloc
+        metrics.FETCH_SECONDS.observe(time.perf_counter() - start, host=host)
+        metrics.FETCH_REQUESTS.inc(host=host, status=status)
+        if content:
+            metrics.FETCH_BYTES.inc(len(content), host=host)
+            metrics.FETCH_SIZE.observe(len(content), host=host)
+
+    @staticmethod
+    def _check(url: str, page: Page):
+        if page.truncated:
+            log.warning(f"{url} 响应体超过 {len(page.content)} 字节，已截断")
+
+    @retry(times=3, delay=1, deadline=settings.fetch_deadline, breaker_key=_host_key)
+    def _get(self, url: str, headers: Dict, timeout: float, max_bytes: Optional[int] = None) -> Page:
+        """
+        流式下载：非 HTML 的 Content-Type 在读取响应体前就放弃，
+        响应体最多读取 max_bytes（默认 settings.fetch_max_bytes）字节。
+        """
+        start = time.perf_counter()
+        try:
+            r = self.session.get(url, headers=headers, timeout=timeout, stream=True)
+            if r.status_code == 304:
+                r.close()
+                page = Page(304, r.headers, b"")
+            else:
+                try:
+                    r.raise_for_status()
+                    check_content_type(r.headers.get("Content-Type"))
+                except Exception:
+                    r.close()
+                    raise
+                content, truncated = read_capped(r, max_bytes or settings.fetch_max_bytes, timeout)
+                page = Page(r.status_code, r.headers, content, truncated)
+        except requests.HTTPError as e:
+            self._record(url, start, e.response.status_code)
+            raise
+        except Exception as e:
+            self._record(url, start, type(e).__name__)
+            raise
+        self._record(url, start, page.status, page.content)
+        self._check(url, page)
+        return page
+
+    @retry(times=3, delay=1, deadline=settings.fetch_deadline, breaker_key=_host_key)
+    async def _aget(self, client: httpx.AsyncClient, url: str, headers: Dict, timeout: float,
+                    max_bytes: Optional[int] = None) -> Page:
+        start = time.perf_counter()
+        try:
+            async with client.stream("GET", url, headers=headers, timeout=timeout) as r:
+                if r.status_code == 304:
+                    page = Page(304, r.headers, b"")
+                else:
+                    r.raise_for_status()
+                    check_content_type(r.headers.get("Content-Type"))
+                    content, truncated = await aread_capped(r, max_bytes or settings.fetch_max_bytes, timeout)
+                    page = Page(r.status_code, r.headers, content, truncated)
+        except httpx.HTTPStatusError as e:
+            self._record(url, start, e.response.status_code)
+            raise
+        except Exception as e:
+            self._record(url, start, type(e).__name__)
+            raise
+        self._record(url, start, page.status, page.content)
+        self._check(url, page)
+        return page
 
-    @retry(times=3, delay=1)
     def fetch_article(self, url: str, config: Optional[Dict] = None) -> List[Dict]:
         """
         抓取一个网页中的多个文章块（适用于新闻首页或列表页）。
@@ -25,77 +283,236 @@ class Fetcher:
         config 可选项：
             - headers: dict，自定义请求头
             - timeout: int，请求超时时间
-            - encoding: str，指定网页编码
+            - encoding: str，指定网页编码；不指定时依次按 BOM、响应头、<meta charset> 和统计检测确定
             - selectors: dict，自定义CSS选择器
+            - extractor: str，解析器 "lxml" 或 "bs4"，默认取 settings.html_extractor
         """
         config = config or {}
         headers = config.get("headers", HEADERS)
         timeout = config.get("timeout", 10)
         encoding = config.get("encoding")
-        selectors = config.get("selectors", {
-            "item": "article, .post, .news-item, li, .entry",
-            "title": "h2, h3, a.title, .entry-title a",
-            "summary": "p, .summary, .desc",
-            "link_attr": "href"
-        })
+        selectors = config.get("selectors", DEFAULT_SELECTORS)
+
+        key, entry, headers = self._cache_lookup(url, config, headers)
 
         try:
-            r = requests.get(url, headers=headers, timeout=timeout)
-            r.raise_for_status()
-            if encoding:
-                r.encoding = encoding
-
-            soup = BeautifulSoup(r.text, "lxml")
-
-            results = []
-            for item in soup.select(selectors["item"]):
-                title_tag = item.select_one(selectors["title"])
-                summary_tag = item.select_one(selectors["summary"])
-
-                title = title_tag.get_text(strip=True) if title_tag else ""
-                summary = summary_tag.get_text(strip=True) if summary_tag else ""
-                link_tag = title_tag.select_one(selectors["link_attr"]) if title_tag else None
-                link = link_tag["href"] if link_tag and link_tag.has_attr("href") else ""
-
-                # 若 link 是相对路径，则拼接成完整 URL
-                if link and link.startswith("/"):
-                    from urllib.parse import urljoin
-                    link = urljoin(url, link)
-                    
-                if title:
-                    results.append({
-                        "title": title,
-                        "summary": summary,
-                        "link": link,
-                        "source": url
-                    })
-
-            # 如果没提取出结果，则使用 trafilatura 尝试提取全文
-            if not results:
-                extracted = trafilatura.extract(r.text)
-                if extracted:
-                    results = [{
-                        "title": soup.title.string if soup.title else "",
-                        "summary": extracted[:500],
-                        "link": url,
-                        "source": url
-                    }]
+            page = self._get(url, headers, timeout)
+            cached = self._cache_hit(key, entry, page.status, page.headers, page.content)
+            if cached is not None:
+                return cached
+            html = decode_body(page.content, page.headers.get("Content-Type"), encoding)
+            articles = self._parse(html, url, selectors, config.get("extractor"))
+            self._cache_store(key, page.headers, page.content, articles)
+            return articles
 
-            return results
+        except Exception as e:
+            log.error(f"Failed to fetch {url}: {e}")
+            return []
+
+    async def fetch_article_async(self, client: httpx.AsyncClient, url: str, config: Optional[Dict] = None) -> List[Dict]:
+        """
+        fetch_article 的 asyncio 版本，使用共享的 httpx.AsyncClient 连接池。
+        返回结构与 fetch_article 一致。
+        """
+        config = config or {}
+        headers = config.get("headers", HEADERS)
+        timeout = config.get("timeout", 10)
+        encoding = config.get("encoding")
+        selectors = config.get("selectors", DEFAULT_SELECTORS)
+
+        key, entry, headers = self._cache_lookup(url, config, headers)
+
+        try:
+            page = await self._aget(client, url, headers, timeout)
+            cached = self._cache_hit(key, entry, page.status, page.headers, page.content)
+            if cached is not None:
+                return cached
+            html = decode_body(page.content, page.headers.get("Content-Type"), encoding)
+            articles = await self._aparse(html, url, selectors, config.get("extractor"))
+            self._cache_store(key, page.headers, page.content, articles)
+            return articles
 
         except Exception as e:
             log.error(f"Failed to fetch {url}: {e}")
             return []
 
-    def fetch_from_sources(self, sources: List[Dict], min_length: int = 200) -> List[Dict]:
+    async def _fetch_pool(self, sources: List[Dict], emit: Callable[[Tuple[Dict, List[Dict]]], None],
+                          slots: asyncio.Semaphore, stop: Optional[threading.Event] = None):
+        """
+        self.concurrency 个 worker 依次从 sources 中取源抓取，结果交给 emit（不能阻塞）。
+        每个源开始抓取前先占用 slots 的一个名额，调用方取走结果后才释放：
+        调用方消费慢时 worker 停在 acquire 上，后面的源不会提前抓取，结果也不会堆在内存里。
+        """
+        pending = iter(sources)
+        host_limits: Dict[str, asyncio.Semaphore] = {}
+
+        async with self._client_ctx() as client:
+
+            async def worker():
+                while True:
+                    await slots.acquire()
+                    s = None if stop is not None and stop.is_set() else next(pending, None)
+                    if s is None:
+                        # 让其他等待名额的 worker 也能退出
+                        slots.release()
+                        return
+                    host_limit = host_limits.setdefault(urlparse(s["url"]).netloc, asyncio.Semaphore(self.per_host))
+                    async with host_limit:
+                        articles = await self.fetch_article_async(client, s["url"], s.get("config"))
+                    emit((s, articles))
+
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(sources)))))
+
+    async def astream_sources(self, sources: List[Dict], buffer: int = 16) -> AsyncIterator[Tuple[Dict, List[Dict]]]:
+        """
+        并发抓取新闻源，每个源完成后立即产出 (source, articles)。
+        全局并发由 self.concurrency 限制，单域名并发由 self.per_host 限制；
+        正在抓取和已抓取但调用方还没处理完的源合计不超过 self.concurrency + buffer 个。
+        """
+        slots = asyncio.Semaphore(self.concurrency + buffer)
+        out: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        async def run():
+            try:
+                await self._fetch_pool(sources, out.put_nowait, slots)
+            except Exception as e:
+                log.error(f"Async fetch failed: {e}")
+            out.put_nowait(done)
+
+        task = asyncio.create_task(run())
+        try:
+            while (item := await out.get()) is not done:
+                yield item
+                slots.release()
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _adownload(self, client: httpx.AsyncClient, url: str, max_bytes: int, timeout: float) -> Optional[str]:
+        """流式下载文章页，读到 max_bytes 即停止；非 200 或非 HTML 响应返回 None。"""
+        start = time.perf_counter()
+        async with client.stream("GET", url, timeout=timeout) as r:
+            content_type = r.headers.get("Content-Type")
+            try:
+                if r.status_code != 200:
+                    raise UnacceptableResponse(f"status {r.status_code}")
+                check_content_type(content_type)
+            except UnacceptableResponse:
+                self._record(url, start, r.status_code)
+                return None
+            body, _ = await aread_capped(r, max_bytes, timeout)
+        self._record(url, start, r.status_code, body)
+        return decode_body(body, content_type)
+
+    async def _aextract(self, html: str, url: str) -> Optional[str]:
+        pool = _use_pool(html)
+        if pool is None:
+            return await asyncio.to_thread(extract_body, html, url)
+        return await asyncio.get_running_loop().run_in_executor(pool, extract_body, html, url)
+
+    async def afetch_bodies(self, items: List[Dict]) -> int:
+        """
+        并发下载 items 中各条目的 link，用 trafilatura 抽取正文写入 item["text"]，返回成功的条数。
+        - 全局并发 settings.article_concurrency，单域名并发 settings.article_per_host
+        - 每篇最多读取 settings.article_max_bytes 字节，正文最多保留 settings.article_max_chars 个字符
+        - 整个阶段最多 settings.article_deadline 秒，超时未完成的条目保留列表页摘要
+        失败只记日志，不影响后续摘要。
+        """
+        targets = [it for it in items if (it.get("link") or "").startswith(("http://", "https://"))]
+        if not targets:
+            return 0
+        global_limit = asyncio.Semaphore(settings.article_concurrency)
+        host_limits: Dict[str, asyncio.Semaphore] = {}
+
+        async with self._client_ctx() as client:
+
+            async def fetch_one(it) -> bool:
+                url = it["link"]
+                host_limit = host_limits.setdefault(urlparse(url).netloc, asyncio.Semaphore(settings.article_per_host))
+                try:
+                    async with global_limit, host_limit:
+                        html = await self._adownload(client, url, settings.article_max_bytes, settings.article_timeout)
+                    body = await self._aextract(html, url) if html else None
+                except Exception as e:
+                    log.warning(f"Failed to fetch article body {url}: {e}")
+                    return False
+                # 正文比列表页摘要还短时（付费墙、抽取失败等）保留摘要
+                if not body or len(body) <= len(it.get("summary") or ""):
+                    return False
+                it["text"] = body[:settings.article_max_chars]
+                return True
+
+            tasks = [asyncio.create_task(fetch_one(it)) for it in targets]
+            done, pending = await asyncio.wait(tasks, timeout=settings.article_deadline)
+            for t in pending:
+                t.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        filled = sum(1 for t in done if t.result())
+        log.info(f"正文抓取：{len(targets)} 篇中 {filled} 篇成功"
+                 + (f"，{len(pending)} 篇超过 {settings.article_deadline}s 未完成" if pending else ""))
+        return filled
+
+    def fetch_bodies(self, items: List[Dict]) -> int:
+        """afetch_bodies 的同步版本，原地为 items 填充 text 字段。"""
+        return self._run(self.afetch_bodies(items))
+
+    async def afetch_from_sources(self, sources: List[Dict]) -> List[Dict]:
+        results = []
+        async for _, articles in self.astream_sources(sources):
+            results.extend(articles)
+        return results
+
+    def stream_from_sources(self, sources: List[Dict], buffer: int = 16) -> Iterator[Tuple[Dict, List[Dict]]]:
+        """
+        astream_sources 的同步版本：在常驻事件循环中抓取，按完成顺序把每个源的结果交给调用方。
+        与 astream_sources 一样，正在抓取和未处理完的源合计不超过 self.concurrency + buffer 个，
+        调用方处理慢时抓取随之暂停（背压）。
+        """
+        loop = self._ensure_loop()
+        q: queue.Queue = queue.Queue()
+        slots = asyncio.Semaphore(self.concurrency + buffer)
+        stop = threading.Event()
+        done = object()
+
+        async def produce():
+            try:
+                await self._fetch_pool(sources, q.put_nowait, slots, stop)
+            except Exception as e:
+                log.error(f"Async fetch failed: {e}")
+            finally:
+                q.put_nowait(done)
+
+        future = asyncio.run_coroutine_threadsafe(produce(), loop)
+        try:
+            while (item := q.get()) is not done:
+                yield item
+                loop.call_soon_threadsafe(slots.release)
+        finally:
+            if not future.done():
+                # 调用方提前结束：唤醒停在 acquire 上的 worker，让它们看到 stop 后退出
+                stop.set()
+                for _ in range(self.concurrency):
+                    loop.call_soon_threadsafe(slots.release)
+            future.result()
+
+    def fetch_from_sources(self, sources: List[Dict], min_length: int = 200, mode: Optional[str] = None) -> List[Dict]:
         """
         sources = [
             {"url": "https://www.example.com", "config": {...}},
             {"url": "https://www.another.com", "config": {...}}
         ]
+        mode: "async" 或 "thread"，默认取 settings.fetch_mode
         """
+        mode = mode or settings.fetch_mode
         results = []
 
+        if mode == "async":
+            for _, articles in self.stream_from_sources(sources):
+                results.extend(articles)
+            return results
+
         def fetch_one(s):
             try:
                 articles = self.fetch_article(s["url"], s.get("config"))
@@ -104,7 +521,7 @@ class Fetcher:
                 log.error(f"Failed to fetch {s.get('url')}: {e}")
                 return []
 
-        with ThreadPoolExecutor(max_workers=5) as executor:
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
             for res in executor.map(fetch_one, sources):
                 results.extend(res)
                 
@@ -0,0 +1,144 @@
+import codecs
+import re
+import time
+from typing import NamedTuple, Optional, Tuple
+
+# 只在前几 KB 中查找 BOM 和 <meta charset>
+SNIFF_BYTES = 4096
+# 兜底检测只看前 64KB，避免对整个大页面做统计
+DETECT_BYTES = 65536
+CHUNK_SIZE = 65536
+
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+_HEADER_CHARSET = re.compile(r"charset\s*=\s*[\"']?\s*([-\w.:]+)", re.I)
+# 同时匹配 <meta charset="x"> 和 <meta http-equiv="Content-Type" content="text/html; charset=x">
+_META_CHARSET = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*([-\w.:]+)", re.I)
+# 常见的中文站点标注 gb2312/gbk，实际内容常超出其字符集，统一按超集 gb18030 解码
+_ALIASES = {"gb2312": "gb18030", "gbk": "gb18030", "x-gbk": "gb18030"}
+
+
+class UnacceptableResponse(ValueError):
+    """响应不是 HTML 等不应继续处理的情况，属于致命错误，不重试。"""
+
+
+class Page(NamedTuple):
+    """读取完成的响应：状态码、响应头、（可能被截断的）响应体。"""
+    status: int
+    headers: object
+    content: bytes
+    truncated: bool = False
+
+
+def _normalize(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    name = name.strip().lower()
+    name = _ALIASES.get(name, name)
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def check_content_type(content_type: Optional[str]):
+    """未声明类型的响应放行（交给解析器判断），声明了且不是 HTML/XHTML 的直接拒绝。"""
+    if not content_type:
+        return
+    mime = content_type.split(";", 1)[0].strip().lower()
+    if mime and "html" not in mime and mime not in ("text/xml", "application/xml"):
+        raise UnacceptableResponse(f"unexpected Content-Type: {mime}")
+
+
+def header_charset(content_type: Optional[str]) -> Optional[str]:
+    match = _HEADER_CHARSET.search(content_type or "")
+    return _normalize(match.group(1)) if match else None
+
+
+def bom_charset(content: bytes) -> Optional[str]:
+    for bom, name in _BOMS:
+        if content.startswith(bom):
+            return name
+    return None
+
+
+def meta_charset(head: bytes) -> Optional[str]:
+    """文档开头 SNIFF_BYTES 字节内的 <meta charset>。"""
+    match = _META_CHARSET.search(head[:SNIFF_BYTES])
+    name = _normalize(match.group(1).decode("ascii", "ignore")) if match else None
+    # 能用 ASCII 读出 meta 的文档不可能是 UTF-16/32，按 HTML 规范视为 utf-8
+    return "utf-8" if name and name.startswith(("utf-16", "utf-32")) else name
+
+
+def detect_encoding(content: bytes, content_type: Optional[str] = None, configured: Optional[str] = None) -> str:
+    """
+    确定响应体编码，依次尝试：
+    1. 新闻源配置中指定的 encoding
+    2. BOM
+    3. HTTP Content-Type 中的 charset
+    4. 前几 KB 中的 <meta charset>
+    5. charset_normalizer 对前 64KB 的统计检测，仍无结果时用 utf-8
+    """
+    for name in (_normalize(configured), bom_charset(content), header_charset(content_type), meta_charset(content)):
+        if name:
+            return name
+    try:
+        from charset_normalizer import from_bytes
+        best = from_bytes(content[:DETECT_BYTES]).best()
+        if best and best.encoding:
+            return _normalize(best.encoding) or "utf-8"
+    except ImportError:
+        pass
+    return "utf-8"
+
+
+def decode_body(content: bytes, content_type: Optional[str] = None, configured: Optional[str] = None) -> str:
+    return content.decode(detect_encoding(content, content_type, configured), errors="replace")
+
+
+def _declared_length(headers) -> Optional[int]:
+    try:
+        return int(headers.get("Content-Length"))
+    except (TypeError, ValueError):
+        return None
+
+
+def read_capped(resp, max_bytes: int, timeout: float) -> Tuple[bytes, bool]:
+    """
+    流式读取 requests 响应（需以 stream=True 发起），最多 max_bytes 字节，返回 (响应体, 是否被截断)。
+    读取总耗时超过 timeout 秒时抛出 TimeoutError，防止慢速响应长时间占用 worker。
+    """
+    start = time.monotonic()
+    chunks, size, truncated = [], 0, False
+    try:
+        for chunk in resp.iter_content(CHUNK_SIZE):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= max_bytes:
+                truncated = size > max_bytes or (_declared_length(resp.headers) or 0) > max_bytes
+                break
+            if time.monotonic() - start > timeout:
+                raise TimeoutError(f"reading body took longer than {timeout}s")
+    finally:
+        resp.close()
+    return b"".join(chunks)[:max_bytes], truncated
+
+
+async def aread_capped(resp, max_bytes: int, timeout: float) -> Tuple[bytes, bool]:
+    """read_capped 的 httpx 异步版本，需在 client.stream(...) 上下文中调用。"""
+    start = time.monotonic()
+    chunks, size, truncated = [], 0, False
+    async for chunk in resp.aiter_bytes(CHUNK_SIZE):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= max_bytes:
+            truncated = size > max_bytes or (_declared_length(resp.headers) or 0) > max_bytes
+            break
+        if time.monotonic() - start > timeout:
+            raise TimeoutError(f"reading body took longer than {timeout}s")
+    return b"".join(chunks)[:max_bytes], truncated
@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+from .config import settings
+from .utils import log
+
+
+class HttpCache:
+    """
+    列表页的持久化响应缓存。
+
+    每个条目保存 ETag / Last-Modified、响应体哈希以及解析好的文章列表，
+    命中 304 或响应体未变化时可以直接复用文章列表，不必重新解析。
+    条目以 JSON 文件存放在 cache_dir 下，按最近使用时间做数量、体积和过期淘汰。
+    写入时只更新内存中的条目数和总大小，超出上限或每 EVICT_EVERY 次写入才扫描目录，
+    淘汰到上限的 90%，避免每次写入都遍历整个缓存目录。
+    """
+
+    EVICT_EVERY = 500
+    LOW_WATER = 0.9
+
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None, max_age: Optional[int] = None):
+        self.cache_dir = Path(cache_dir or settings.http_cache_dir)
+        self.max_entries = max_entries or settings.http_cache_max_entries
+        self.max_bytes = max_bytes or settings.http_cache_max_mb * 1024 * 1024
+        self.max_age = max_age or settings.http_cache_max_age
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # key -> 文件大小，首次写入时由 evict 扫描目录建立
+        self._sizes: Optional[Dict[str, int]] = None
+        self._total = 0
+        self._writes = 0
+
+    @staticmethod
+    def make_key(url: str, config: Optional[Dict] = None) -> str:
+        # 解析结果依赖选择器、编码和解析器（lxml / bs4），所以一起计入 key
+        config = config or {}
+        extractor = config.get("extractor") or settings.html_extractor
+        raw = json.dumps([url, config.get("selectors"), config.get("encoding"), extractor],
+                         sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def body_hash(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.max_age:
+                path.unlink(missing_ok=True)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, etag: Optional[str], last_modified: Optional[str], body_hash: str, articles: List[Dict]):
+        entry = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "body_hash": body_hash,
+            "articles": articles,
+            "stored_at": time.time(),
+        }
+        path = self._path(key)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            size = tmp.stat().st_size
+            os.replace(tmp, path)
+        except OSError as e:
+            log.warning(f"HTTP cache write failed for {key}: {e}")
+            return
+
+        with self._lock:
+            if self._sizes is not None:
+                self._total += size - self._sizes.get(key, 0)
+                self._sizes[key] = size
+                self._writes += 1
+            need_scan = (self._sizes is None or self._writes >= self.EVICT_EVERY
+                         or len(self._sizes) > self.max_entries or self._total > self.max_bytes)
+        if need_scan:
+            self.evict()
+
+    def touch(self, key: str):
+        """命中后刷新最近使用时间，供 LRU 与过期判断使用。"""
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def evict(self):
+        """扫描缓存目录：删除过期条目，再按最近使用时间淘汰到上限的 LOW_WATER 比例。"""
+        with self._lock:
+            now = time.time()
+            entries = []
+            for p in self.cache_dir.glob("*.json"):
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                if now - st.st_mtime > self.max_age:
+                    p.unlink(missing_ok=True)
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+
+            entries.sort()  # 最久未使用的在前
+            total = sum(size for _, size, _ in entries)
+            if len(entries) > self.max_entries or total > self.max_bytes:
+                max_entries, max_bytes = int(self.max_entries * self.LOW_WATER), self.max_bytes * self.LOW_WATER
+                while entries and (len(entries) > max_entries or total > max_bytes):
+                    _, size, p = entries.pop(0)
+                    p.unlink(missing_ok=True)
+                    total -= size
+
+            self._sizes = {p.stem: size for _, size, p in entries}
+            self._total = total
+            self._writes = 0
@@ -0,0 +1,193 @@
+import json
+import re
+import threading
+import time
+from typing import Callable, List, Optional, TypeVar
+from langchain_core.messages import AIMessage, HumanMessage
+from .config import settings
+from .utils import RateLimiter, estimate_tokens, log
+from . import metrics
+
+T = TypeVar("T")
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """进程内所有 LLM 调用共享的限流器（LLM_RPM / LLM_TPM）。"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(settings.llm_rpm, settings.llm_tpm)
+        return _limiter
+
+
+def build_chat_model(model: str, **kwargs):
+    """
+    按 settings.llm_provider 创建聊天模型：
+    - google：ChatGoogleGenerativeAI
+    - fake：离线假模型，用于测试吞吐和基准
+    """
+    if settings.llm_provider == "fake":
+        return FakeChatModel(latency=settings.fake_llm_latency)
+
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model=model,
+        google_api_key=settings.google_api_key,
+        **kwargs,
+    )
+
+
+def invoke_llm(model, prompt: str, stage: str, prompt_tokens: Optional[int] = None, model_name: str = ""):
+    """调用模型，并按 stage 和模型名记录耗时、token 数（估算）和失败次数。"""
+    prompt_tokens = estimate_tokens(prompt) if prompt_tokens is None else prompt_tokens
+    metrics.LLM_TOKENS.inc(prompt_tokens, stage=stage, model=model_name, kind="prompt")
+    start = time.perf_counter()
+    try:
+        response = model.invoke([HumanMessage(content=prompt)])
+    except Exception as e:
+        metrics.LLM_FAILURES.inc(stage=stage, reason=type(e).__name__)
+        raise
+    finally:
+        metrics.LLM_SECONDS.observe(time.perf_counter() - start, stage=stage, model=model_name)
+    metrics.LLM_TOKENS.inc(estimate_tokens(str(response.content)), stage=stage, model=model_name, kind="completion")
+    return response
+
+
+def llm_breaker_key(*args, model_name: str = "", **kwargs) -> str:
+    """熔断器按模型划分，快模型不可用时不影响升级到强模型。"""
+    return f"llm:{model_name}" if model_name else "llm"
+
+
+class InvalidReply(ValueError):
+    """模型回复无法通过校验（JSON 无效、缺字段等）。"""
+
+
+class ModelCascade:
+    """
+    模型级联：先用快模型（settings.llm_fast_model），以下情况改用强模型（settings.llm_strong_model）：
+    - 输入规模超过 escalate_tokens（默认 settings.llm_escalate_tokens），直接用强模型
+    - 快模型调用失败（重试之后仍失败）或回复没有通过校验，用强模型重做一次
+    settings.llm_cascade 为 False 或两个模型相同时只用强模型。
+    每次调用按 stage 和模型计数，升级按原因（long/invalid/error）计数。
+    """
+
+    FAST, STRONG = "fast", "strong"
+
+    def __init__(self, stage: str, strong_model: Optional[str] = None, fast_model: Optional[str] = None,
+                 llm=None, fast_llm=None, escalate_tokens: Optional[int] = None, **kwargs):
+        """
+        :param llm / fast_llm: 可选，直接注入的强 / 快模型（如 FakeChatModel），只注入 llm 时两级共用它
+        :param kwargs: 传给 build_chat_model 的参数（temperature 等）
+        """
+        self.stage = stage
+        strong_name = strong_model or settings.llm_strong_model
+        fast_name = fast_model or settings.llm_fast_model
+        self.enabled = settings.llm_cascade and fast_name != strong_name
+        self.escalate_tokens = escalate_tokens or settings.llm_escalate_tokens
+        self.names = {self.STRONG: strong_name, self.FAST: fast_name if self.enabled else strong_name}
+        strong = llm or build_chat_model(strong_name, **kwargs)
+        fast = (fast_llm or llm or build_chat_model(fast_name, **kwargs)) if self.enabled else strong
+        self.models = {self.STRONG: strong, self.FAST: fast}
+
+    @property
+    def name(self) -> str:
+        """参与缓存 key 的模型标识。"""
+        return f"{self.names[self.FAST]}>{self.names[self.STRONG]}" if self.enabled else self.names[self.STRONG]
+
+    def _attempt(self, tier: str, call: Callable, parse: Callable[[object], T]) -> T:
+        name = self.names[tier]
+        metrics.LLM_CALLS.inc(stage=self.stage, model=name)
+        response = call(self.models[tier], name)
+        try:
+            return parse(response)
+        except Exception as e:
+            metrics.LLM_FAILURES.inc(stage=self.stage, reason="invalid_reply")
+            raise InvalidReply(str(e)) from e
+
+    def run(self, call: Callable, parse: Callable[[object], T], size: int = 0) -> T:
+        """
+        :param call: call(model, model_name) -> 模型回复
+        :param parse: 校验并解析回复，失败时抛异常
+        :param size: 输入规模（token 数），超过 escalate_tokens 时直接用强模型
+        强模型也失败时抛出异常（回复无效时为 InvalidReply）。
+        """
+        if not self.enabled:
+            return self._attempt(self.STRONG, call, parse)
+        if size > self.escalate_tokens:
+            metrics.LLM_ESCALATIONS.inc(stage=self.stage, reason="long")
+            return self._attempt(self.STRONG, call, parse)
+        try:
+            return self._attempt(self.FAST, call, parse)
+        except Exception as e:
+            reason = "invalid" if isinstance(e, InvalidReply) else "error"
+            metrics.LLM_ESCALATIONS.inc(stage=self.stage, reason=reason)
+            log.info(f"{self.stage}: {self.names[self.FAST]} 失败（{reason}: {e}），改用 {self.names[self.STRONG]}")
+        return self._attempt(self.STRONG, call, parse)
+
+
+def _fake_reply(prompt: str) -> str:
+    """根据提示词类型构造确定性的回复。"""
+    # 文章挑选：返回索引数组
+    if "请返回 JSON 数组" in prompt:
+        indices = [int(i) for i in re.findall(r"^(\d+): 标题：", prompt, flags=re.M)]
+        return json.dumps(indices)
+
+    # 多篇打包摘要：按编号返回 JSON 数组
+    if "用 index 标明新闻编号" in prompt:
+        entries = re.findall(r"^\[(\d+)\] 标题：(.*)\n原文：(.*)$", prompt, flags=re.M)
+        return json.dumps([{
+            "index": int(i),
+            "summary": summary.strip()[:200],
+            "categories": ["科技"] if "机器人" in title else ["其他"],
+        } for i, title, summary in entries], ensure_ascii=False)
+
+    # 单篇摘要：用标题和原文拼出 JSON
+    title = re.search(r"标题：(.*)", prompt)
+    summary = re.search(r"原文：(.*)", prompt)
+    return json.dumps({
+        "summary": (summary.group(1) if summary else "").strip()[:200],
+        "categories": ["科技"] if title and "机器人" in title.group(1) else ["其他"],
+    }, ensure_ascii=False)
+
+
+class FakeChatModel:
+    """
+    确定性的假聊天模型，接口与 langchain 聊天模型的 invoke 一致。
+    latency 模拟单次调用耗时；responder 可自定义回复内容。
+    """
+
+    def __init__(self, latency: float = 0.0, responder: Optional[Callable[[str], str]] = None):
+        self.latency = latency
+        self.responder = responder or _fake_reply
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, messages: List, **kwargs) -> AIMessage:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = "\n".join(str(m.content) for m in messages)
+        return AIMessage(content=self.responder(prompt))
+
+
+if __name__ == "__main__":
+    # 离线对比串行与并发批量摘要的吞吐
+    from .summarizer import Summarizer
+
+    settings.summary_cache = False  # 只测模型调用的吞吐
+    items = [{"title": f"机器人新闻 {i}", "summary": f"第 {i} 条新闻的原始摘要。", "link": f"https://example.com/{i}"}
+             for i in range(50)]
+    for concurrency, batch_size in ((1, 1), (8, 1), (16, 1), (8, 10)):
+        summarizer = Summarizer(llm=FakeChatModel(latency=0.2))
+        stats = {}
+        start = time.perf_counter()
+        out = summarizer.batch_summarize([dict(it) for it in items], concurrency=concurrency, batch_size=batch_size,
+                                         stats=stats)
+        elapsed = time.perf_counter() - start
+        assert [o["title"] for o in out] == [it["title"] for it in items]
+        print(f"concurrency={concurrency:>2} batch={batch_size:>2}: {len(out)} 条，耗时 {elapsed:.2f}s，"
+              f"{len(out) / elapsed:.1f} 条/秒，LLM 调用 {stats['llm_calls']} 次")
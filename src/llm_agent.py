@@ -1,4 +1,5 @@
 from langchain.agents import create_agent
+from langchain.agents.middleware import AgentMiddleware, ModelResponse
 from langchain.tools import tool
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.checkpoint.memory import InMemorySaver  
@@ -9,16 +10,55 @@ from .tools.news_report_tool import news_report
 from .db import init_db
 from .utils import log
 from .config import settings
+from . import metrics
 import os
 
+
+class EscalateMiddleware(AgentMiddleware):
+    """
+    对话 agent 的模型级联：每一步先用快模型，
+    调用失败或生成了无法解析的工具调用时，用强模型重做这一步。
+    """
+
+    def __init__(self, strong_model, fast_name: str, strong_name: str):
+        super().__init__()
+        self.strong_model = strong_model
+        self.fast_name = fast_name
+        self.strong_name = strong_name
+
+    def wrap_model_call(self, request, handler):
+        metrics.LLM_CALLS.inc(stage="agent", model=self.fast_name)
+        try:
+            response = handler(request)
+        except Exception as e:
+            reason = "error"
+            log.info(f"agent: {self.fast_name} 调用失败（{e}），改用 {self.strong_name}")
+        else:
+            message = response.result[-1] if isinstance(response, ModelResponse) else response
+            if not getattr(message, "invalid_tool_calls", None):
+                return response
+            reason = "invalid"
+        metrics.LLM_ESCALATIONS.inc(stage="agent", reason=reason)
+        metrics.LLM_CALLS.inc(stage="agent", model=self.strong_name)
+        return handler(request.override(model=self.strong_model))
+
+
 def build_news_agent(api_key: str | None = None):
     api_key = api_key or settings.google_api_key or os.getenv("GOOGLE_API_KEY")
-    model = ChatGoogleGenerativeAI(
-        model="gemini-2.5-pro",
-        temperature=0.2,
-        google_api_key=api_key,
-        convert_system_message_to_human=True
-    )
+
+    def chat_model(name: str):
+        return ChatGoogleGenerativeAI(
+            model=name,
+            temperature=0.2,
+            google_api_key=api_key,
+            convert_system_message_to_human=True
+        )
+
+    # 开启级联时 agent 用快模型决定调用哪个工具，出错再交给强模型
+    cascade = settings.llm_cascade and settings.llm_fast_model != settings.llm_strong_model
+    model = chat_model(settings.llm_fast_model if cascade else settings.llm_strong_model)
+    middleware = [EscalateMiddleware(chat_model(settings.llm_strong_model), settings.llm_fast_model,
+                                     settings.llm_strong_model)] if cascade else []
 
     tools = [
         # fetch_news,
@@ -59,10 +99,34 @@ def build_news_agent(api_key: str | None = None):
     model= model,
     tools=tools,
     system_prompt=NEWS_AGENT_PROMPT,
+    middleware=middleware,
     checkpointer=InMemorySaver()
 )
     return agent
 
+def extract_reply(res: dict) -> str:
+    """从 agent.invoke 的返回中取出最后一条 AI 回复的文本。"""
+    for m in reversed(res.get("messages", [])):
+        if hasattr(m, "content") and m.content:
+            # content 可能是 list
+            content = m.content
+
+            # 如果 content 是 list，就逐个从字典提取 text
+            if isinstance(content, list):
+                texts = []
+                for part in content:
+                    if isinstance(part, dict) and "text" in part:
+                        texts.append(part["text"])
+                    elif hasattr(part, "text"):
+                        texts.append(part.text)
+                    elif isinstance(part, str):
+                        texts.append(part)
+                return "\n".join(texts)
+            # 如果 content 就是字符串
+            return content
+    return ""
+
+
 if __name__ == "__main__":
     init_db()
     log.info("启动 LLM Agent... 请以自然语言指令和 agent 交互，例如：\n\n  抓取机器人新闻并生成 PDF。\n")
@@ -79,33 +143,9 @@ if __name__ == "__main__":
             res = agent.invoke({"messages": [{"role": "user", "content": prompt}]},{"configurable": {"thread_id": "1"}})
 
             # 获取 AI 回复内容（取最后一条 AIMessage 对象的 content 属性）
-            ai_reply = None
-
-            for m in reversed(res.get("messages", [])):
-                if hasattr(m, "content") and m.content:
-                    # content 可能是 list
-                    content = m.content
-                    
-                    # 如果 content 是 list，就逐个从字典提取 text
-                    if isinstance(content, list):
-                        texts = []
-                        for part in content:
-                            if isinstance(part, dict) and "text" in part:
-                                texts.append(part["text"])
-                            elif hasattr(part, "text"):
-                                texts.append(part.text)
-                            elif isinstance(part, str):
-                                texts.append(part)
-                        ai_reply = "\n".join(texts)
-                    else:
-                        # 如果 content 就是字符串
-                        ai_reply = content
-                        print("DEBUG: AI message content:", ai_reply)
-                    break
+            ai_reply = extract_reply(res)
 
             print("Agent:", ai_reply)
 
         except KeyboardInterrupt:
             break
-
-
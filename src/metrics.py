@@ -0,0 +1,206 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Tuple
+
+# Prometheus 默认的延迟分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# 响应体大小分桶（字节），1KB ~ 16MB
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _label_key(labelnames: Tuple[str, ...], labels: Dict[str, str]) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _format_labels(labelnames: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    """与 Prometheus 客户端一样不丢精度：整数值不带小数点，其余用 repr（:g 只保留 6 位有效数字）。"""
+    value = float(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer() and abs(value) < 2 ** 53:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield self.name, _format_labels(self.labelnames, key), value
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [{"labels": dict(zip(self.labelnames, k)), "value": v} for k, v in sorted(self._values.items())]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # 每组标签：[各桶计数..., 总数, 总和]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * len(self.buckets) + [0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-2] += 1
+            data[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """with HIST.time(stage="x"): ... 记录代码块耗时（秒），异常时也记录。"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        for key, data in items:
+            for bound, count in zip(self.buckets, data):
+                yield f"{self.name}_bucket", _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"'), count
+            yield f"{self.name}_bucket", _format_labels(self.labelnames, key, 'le="+Inf"'), data[-2]
+            yield f"{self.name}_count", _format_labels(self.labelnames, key), data[-2]
+            yield f"{self.name}_sum", _format_labels(self.labelnames, key), data[-1]
+
+    def snapshot(self) -> list:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        return [{
+            "labels": dict(zip(self.labelnames, key)),
+            "count": data[-2],
+            "sum": round(data[-1], 6),
+            "avg": round(data[-1] / data[-2], 6) if data[-2] else 0.0,
+            "buckets": {_format_value(b): c for b, c in zip(self.buckets, data)},
+        } for key, data in items]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, doc: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, doc, labelnames))
+
+    def histogram(self, name: str, doc: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, doc, labelnames, buckets))
+
+    def reset(self):
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+    def render_prometheus(self) -> str:
+        """Prometheus 文本格式（text/plain; version=0.0.4）。"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.doc}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {m.name: {"type": m.kind, "help": m.doc, "samples": m.snapshot()} for m in list(self._metrics.values())}
+
+    def dump_json(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+
+REGISTRY = Registry()
+
+# ---------------- 各阶段指标 ----------------
+FETCH_SECONDS = REGISTRY.histogram("news_fetch_seconds", "HTTP 请求耗时（每次尝试）", ("host",))
+FETCH_REQUESTS = REGISTRY.counter("news_fetch_requests_total", "HTTP 请求数，按状态码", ("host", "status"))
+FETCH_BYTES = REGISTRY.counter("news_fetch_bytes_total", "下载的响应体字节数", ("host",))
+FETCH_SIZE = REGISTRY.histogram("news_fetch_response_bytes", "单个响应体的字节数分布", ("host",), SIZE_BUCKETS)
+PARSE_SECONDS = REGISTRY.histogram("news_parse_seconds", "列表页解析耗时", ("source",))
+LLM_SECONDS = REGISTRY.histogram("news_llm_seconds", "LLM 调用耗时", ("stage", "model"))
+LLM_TOKENS = REGISTRY.counter("news_llm_tokens_total", "LLM token 数（估算），kind 为 prompt/completion", ("stage", "model", "kind"))
+LLM_CALLS = REGISTRY.counter("news_llm_calls_total", "模型级联中各模型被选用的次数", ("stage", "model"))
+LLM_ESCALATIONS = REGISTRY.counter("news_llm_escalations_total", "从快模型升级到强模型的次数，reason 为 long/invalid/error", ("stage", "reason"))
+LLM_FAILURES = REGISTRY.counter("news_llm_failures_total", "LLM 调用失败或回复无效的次数", ("stage", "reason"))
+SUMMARY_INPUT_TOKENS = REGISTRY.counter("news_summary_input_tokens_total", "摘要原文 token 数（估算），kind 为 original/sent（压缩后）", ("kind",))
+DB_WRITE_SECONDS = REGISTRY.histogram("news_db_write_seconds", "save_items 批量写入耗时")
+DB_ROWS = REGISTRY.counter("news_db_rows_total", "save_items 写入的行数")
+RENDER_SECONDS = REGISTRY.histogram("news_render_seconds", "报告渲染耗时", ("format",))
+SCHEDULER_POLLS = REGISTRY.counter("news_scheduler_polls_total", "定时抓取的源次数，result 为 new/empty/error", ("result",))
+REPORT_REQUESTS = REGISTRY.counter("news_report_requests_total", "news_report 请求数，result 为 miss/hit/coalesced/incremental", ("result",))
+
+
+def dump_run_metrics(path: Optional[str] = None):
+    """一次运行结束时把指标写成 JSON，path 默认取 settings.metrics_file，为空则不写。"""
+    from .config import settings
+    from .utils import log
+
+    path = path or settings.metrics_file
+    if not path:
+        return
+    try:
+        REGISTRY.dump_json(path)
+        log.info(f"运行指标已写入 {path}")
+    except OSError as e:
+        log.warning(f"写入运行指标失败: {e}")
+
+
+if __name__ == "__main__":
+    FETCH_SECONDS.observe(0.12, host="example.com")
+    FETCH_REQUESTS.inc(host="example.com", status="200")
+    with LLM_SECONDS.time(stage="summarize", model="fake"):
+        time.sleep(0.01)
+    print(REGISTRY.render_prometheus())
@@ -0,0 +1,171 @@
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from .cleaner import clean_text
+from .db import save_items
+from .dedup import Deduplicator
+from .seen import filter_incremental, commit_incremental
+from .config import settings
+from .utils import log
+
+_DONE = object()
+
+
+def prepare_item(r: Dict) -> Dict:
+    """把抓取结果整理成摘要 / 入库使用的条目。"""
+    text = r.get('text') or r.get('summary') or ''
+    text = clean_text(text)
+    return {
+        'title': r.get('title') or '',
+        'link': r.get('link'),
+        'published': r.get('published'),
+        'source': r.get('source'),
+        'summary': clean_text(r.get('summary') or '') or text,
+        'text': text
+    }
+
+
+def report_entry(it: Dict) -> Dict:
+    """报告只需要的字段，避免在管道末端持有原文。"""
+    return {k: it.get(k) for k in ('title', 'link', 'source', 'summary', 'summary_generated', 'categories')}
+
+
+class StreamingPipeline:
+    """
+    流式管道：抓取 -> 清洗/去重 ->（正文抓取）-> 摘要 -> 入库，各阶段在独立线程中运行，
+    之间用有界队列连接。某个源一返回，它的条目就进入后续阶段；
+    下游处理不过来时队列写满，上游自然阻塞（背压），内存占用与源的数量无关。
+    """
+
+    def __init__(self, fetcher, summarizer, incremental: bool = False,
+                 buffer: Optional[int] = None, chunk: Optional[int] = None, flush_interval: float = 2.0):
+        """
+        :param buffer: 各阶段之间队列的容量（条目/批次数），默认 settings.pipeline_buffer
+        :param chunk: 每次送去摘要、入库的条目数，默认 settings.pipeline_chunk
+        :param flush_interval: 上游较慢时，凑不满 chunk 也在这么多秒后送出
+        """
+        self.fetcher = fetcher
+        self.summarizer = summarizer
+        self.incremental = incremental
+        self.buffer = buffer or settings.pipeline_buffer
+        self.chunk = chunk or settings.pipeline_chunk
+        self.flush_interval = flush_interval
+        self.stats = {"fetched": 0, "kept": 0, "summarized": 0, "saved": 0}
+
+    def _stage(self, name: str, fn: Callable, inbox: queue.Queue, outbox: Optional[queue.Queue]) -> threading.Thread:
+        def run():
+            try:
+                while True:
+                    item = inbox.get()
+                    if item is _DONE:
+                        break
+                    try:
+                        out = fn(item)
+                    except Exception as e:
+                        log.error(f"Pipeline stage {name} failed: {e}")
+                        continue
+                    if outbox is not None and out:
+                        outbox.put(out)
+            finally:
+                if outbox is not None:
+                    outbox.put(_DONE)
+
+        t = threading.Thread(target=run, name=f"pipeline-{name}", daemon=True)
+        t.start()
+        return t
+
+    def _batcher(self, inbox: queue.Queue, outbox: queue.Queue) -> threading.Thread:
+        """把逐源到达的条目攒成 chunk 大小的批次，超时未满也会送出。"""
+        def run():
+            pending: List[Dict] = []
+            deadline = time.monotonic() + self.flush_interval
+            try:
+                while True:
+                    try:
+                        items = inbox.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        items = None
+                    if items is _DONE:
+                        break
+                    if items:
+                        pending.extend(items)
+                    while len(pending) >= self.chunk:
+                        outbox.put(pending[:self.chunk])
+                        pending = pending[self.chunk:]
+                    if items is None or time.monotonic() >= deadline:
+                        if pending:
+                            outbox.put(pending)
+                            pending = []
+                        deadline = time.monotonic() + self.flush_interval
+                if pending:
+                    outbox.put(pending)
+            finally:
+                outbox.put(_DONE)
+
+        t = threading.Thread(target=run, name="pipeline-batch", daemon=True)
+        t.start()
+        return t
+
+    def run(self, sources: List[Dict]) -> List[Dict]:
+        """执行整条管道，返回供报告使用的精简条目列表。"""
+        raw_q: queue.Queue = queue.Queue(self.buffer)
+        clean_q: queue.Queue = queue.Queue(self.buffer)
+        batch_q: queue.Queue = queue.Queue(self.buffer)
+        done_q: queue.Queue = queue.Queue(self.buffer)
+        dedup = Deduplicator()
+        results: List[Dict] = []
+
+        def clean(articles: List[Dict]) -> List[Dict]:
+            self.stats["fetched"] += len(articles)
+            items = [it for it in map(prepare_item, articles) if dedup.accept(it)]
+            if self.incremental and items:
+                items, _ = filter_incremental(items)
+            self.stats["kept"] += len(items)
+            return items
+
+        def fetch_bodies(items: List[Dict]) -> List[Dict]:
+            self.fetcher.fetch_bodies(items)
+            return items
+
+        def summarize(items: List[Dict]) -> List[Dict]:
+            items = self.summarizer.batch_summarize(items)
+            self.stats["summarized"] += len(items)
+            return items
+
+        def persist(items: List[Dict]):
+            save_items(items)
+            if self.incremental:
+                commit_incremental(items)
+            self.stats["saved"] += len(items)
+            results.extend(report_entry(it) for it in items)
+
+        threads = [
+            self._stage("clean", clean, raw_q, clean_q),
+            self._batcher(clean_q, batch_q),
+        ]
+        if settings.full_text:
+            # 正文抓取作为独立阶段，与摘要、入库重叠进行
+            body_q: queue.Queue = queue.Queue(self.buffer)
+            threads.append(self._stage("bodies", fetch_bodies, batch_q, body_q))
+            batch_q = body_q
+        threads += [
+            self._stage("summarize", summarize, batch_q, done_q),
+            self._stage("persist", persist, done_q, None),
+        ]
+        try:
+            for _, articles in self.fetcher.stream_from_sources(sources, buffer=self.buffer):
+                if articles:
+                    raw_q.put(articles)
+        finally:
+            raw_q.put(_DONE)
+            for t in threads:
+                t.join()
+
+        if self.incremental:
+            # 没有新条目的来源也记录本次运行时间
+            commit_incremental([], [s["url"] for s in sources])
+        dedup.report(self.stats["fetched"])
+        log.info(f"流式管道完成：抓取 {self.stats['fetched']} 条，保留 {self.stats['kept']} 条，"
+                 f"摘要 {self.stats['summarized']} 条，入库 {self.stats['saved']} 条")
+        return results
@@ -0,0 +1,105 @@
+import math
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+
+# 各项得分的权重：与查询的相关度、时效性、来源权重、在来源页面中的位置。
+# 一批文章中完全没有数据的信号（无查询、都没有发布时间、没有配置来源权重）不参与打分，其余权重按比例放大到合计为 1
+RELEVANCE_WEIGHT = 0.6
+RECENCY_WEIGHT = 0.2
+SOURCE_WEIGHT = 0.15
+POSITION_WEIGHT = 0.05
+RECENCY_HALF_LIFE_HOURS = 24
+# 没有发布时间的文章的时效性得分，相当于发布于一个半衰期之前
+UNKNOWN_RECENCY = 0.5
+
+
+def parse_published(value) -> Optional[datetime]:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        try:
+            dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            try:
+                dt = parsedate_to_datetime(str(value))
+            except (TypeError, ValueError):
+                return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _relevance(articles: List[Dict], query: str) -> List[float]:
+    """TF-IDF 字符 n-gram 与查询的余弦相似度，中英文都适用。"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    docs = [f"{a.get('title') or ''} {a.get('summary') or ''}" for a in articles]
+    try:
+        vectorizer = TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 3), sublinear_tf=True)
+        matrix = vectorizer.fit_transform(docs + [query])
+    except ValueError:
+        # 文本全为空等情况
+        return [0.0] * len(articles)
+    # TfidfVectorizer 默认做 L2 归一化，点积即余弦相似度
+    return (matrix[:-1] @ matrix[-1].T).toarray().ravel().tolist()
+
+
+def score_articles(articles: List[Dict], query: Optional[str] = None,
+                   source_weights: Optional[Dict[str, float]] = None,
+                   now: Optional[datetime] = None) -> List[float]:
+    """
+    本地打分，不调用 LLM，得分在 [0, 1] 之间：
+    - 相关度：与用户查询的 TF-IDF 相似度
+    - 时效性：按 published（列表页上解析出的发布时间）指数衰减，半衰期 RECENCY_HALF_LIFE_HOURS，
+      缺失时为 UNKNOWN_RECENCY
+    - 来源权重：source_weights[source]（新闻源 YAML 中的 weight），按最大值归一化，未配置的来源为 1
+    - 位置：同一来源中越靠前越重要
+    没有查询、整批都没有发布时间或没有任何来源权重时，对应的信号不参与打分（见 RELEVANCE_WEIGHT 处的说明）。
+    """
+    if not articles:
+        return []
+    now = now or datetime.now(timezone.utc)
+    source_weights = source_weights or {}
+
+    relevance = _relevance(articles, query) if query else [0.0] * len(articles)
+    max_weight = max([1.0, *source_weights.values()])
+    has_published = any(parse_published(a.get("published")) for a in articles)
+    signal_weights = (
+        RELEVANCE_WEIGHT if query else 0.0,
+        RECENCY_WEIGHT if has_published else 0.0,
+        SOURCE_WEIGHT if source_weights else 0.0,
+        POSITION_WEIGHT,
+    )
+    total = sum(signal_weights)
+    w_relevance, w_recency, w_source, w_position = (w / total for w in signal_weights)
+
+    positions: Dict[str, int] = {}
+    scores = []
+    for a, rel in zip(articles, relevance):
+        published = parse_published(a.get("published"))
+        if published:
+            age_hours = max(0.0, (now - published).total_seconds() / 3600)
+            recency = math.pow(0.5, age_hours / RECENCY_HALF_LIFE_HOURS)
+        else:
+            recency = UNKNOWN_RECENCY
+
+        source = a.get("source") or ""
+        weight = source_weights.get(source, 1.0) / max_weight
+        pos = positions.get(source, 0)
+        positions[source] = pos + 1
+
+        scores.append(
+            w_relevance * rel
+            + w_recency * recency
+            + w_source * weight
+            + w_position / (1 + pos)
+        )
+    return scores
+
+
+def rank_articles(articles: List[Dict], query: Optional[str] = None,
+                  source_weights: Optional[Dict[str, float]] = None) -> List[int]:
+    """返回按本地得分从高到低排序的索引，得分相同保持原顺序。"""
+    scores = score_articles(articles, query, source_weights)
+    return sorted(range(len(articles)), key=lambda i: -scores[i])
@@ -1,47 +1,152 @@
 import re
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Flowable
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import mm
-from reportlab.pdfbase.cidfonts import UnicodeCIDFont
-from reportlab.pdfbase import pdfmetrics
-from reportlab.lib import colors
-from typing import List, Dict
-
-# 注册中文字体
-pdfmetrics.registerFont(UnicodeCIDFont('STSong-Light'))
-
-styles = getSampleStyleSheet()
-
-# 基础样式
-styles.add(ParagraphStyle(name='TitleCN', parent=styles['Title'], fontName='STSong-Light', fontSize=24, leading=30, spaceAfter=18))
-styles.add(ParagraphStyle(name='CategoryTitle', fontName='STSong-Light', backColor=colors.HexColor("#4B7BFA"), textColor=colors.white, fontSize=16, leading=22, leftIndent=0, spaceBefore=18, spaceAfter=8, padding=6))
-styles.add(ParagraphStyle(name='ItemTitleEn', fontName='Helvetica', fontSize=13, leading=18, textColor=colors.HexColor("#222222"), spaceAfter=4))
-styles.add(ParagraphStyle(name='ItemTitleCn', fontName='STSong-Light', fontSize=13, leading=18, textColor=colors.HexColor("#222222"), spaceAfter=4))
-styles.add(ParagraphStyle(name='BodyEn', fontName='Helvetica', fontSize=11, leading=17, spaceAfter=4))
-styles.add(ParagraphStyle(name='BodyCn', fontName='STSong-Light', fontSize=11, leading=17, spaceAfter=4))
-styles.add(ParagraphStyle(name='Source', fontName='Helvetica', fontSize=10, textColor=colors.HexColor("#1a0dab"), leading=14, spaceAfter=10))  # 蓝色链接
-
-# 左侧竖条
-class LeftBar(Flowable):
-    def __init__(self, height, color=colors.HexColor("#4B7BFA")):
-        Flowable.__init__(self)
-        self.height = height
-        self.color = color
-    def draw(self):
-        self.canv.setFillColor(self.color)
-        self.canv.rect(0, 0, 3, self.height, fill=1, stroke=0)
-    def wrap(self, availWidth, availHeight):
-        return 3, self.height
+import html
+import os
+import time
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
+from .config import settings
+from .utils import log
+from . import metrics
+
+
+@lru_cache(maxsize=1)
+def get_styles():
+    """
+    PDF 样式表。ReportLab 导入和中文字体注册较慢，只在第一次生成 PDF 时执行；
+    Markdown/HTML 报告完全不依赖 ReportLab。
+    """
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.lib import colors
+
+    # 注册中文字体
+    pdfmetrics.registerFont(UnicodeCIDFont('STSong-Light'))
+
+    styles = getSampleStyleSheet()
+
+    # 基础样式
+    styles.add(ParagraphStyle(name='TitleCN', parent=styles['Title'], fontName='STSong-Light', fontSize=24, leading=30, spaceAfter=18))
+    styles.add(ParagraphStyle(name='CategoryTitle', fontName='STSong-Light', backColor=colors.HexColor("#4B7BFA"), textColor=colors.white, fontSize=16, leading=22, leftIndent=0, spaceBefore=18, spaceAfter=8, padding=6))
+    styles.add(ParagraphStyle(name='ItemTitleEn', fontName='Helvetica', fontSize=13, leading=18, textColor=colors.HexColor("#222222"), spaceAfter=4))
+    styles.add(ParagraphStyle(name='ItemTitleCn', fontName='STSong-Light', fontSize=13, leading=18, textColor=colors.HexColor("#222222"), spaceAfter=4))
+    styles.add(ParagraphStyle(name='BodyEn', fontName='Helvetica', fontSize=11, leading=17, spaceAfter=4))
+    styles.add(ParagraphStyle(name='BodyCn', fontName='STSong-Light', fontSize=11, leading=17, spaceAfter=4))
+    styles.add(ParagraphStyle(name='Source', fontName='Helvetica', fontSize=10, textColor=colors.HexColor("#1a0dab"), leading=14, spaceAfter=10))  # 蓝色链接
+    return styles
+
+
+@lru_cache(maxsize=1)
+def _left_bar_class():
+    from reportlab.platypus import Flowable
+    from reportlab.lib import colors
+
+    # 左侧竖条
+    class LeftBar(Flowable):
+        def __init__(self, height, color=colors.HexColor("#4B7BFA")):
+            Flowable.__init__(self)
+            self.height = height
+            self.color = color
+        def draw(self):
+            self.canv.setFillColor(self.color)
+            self.canv.rect(0, 0, 3, self.height, fill=1, stroke=0)
+        def wrap(self, availWidth, availHeight):
+            return 3, self.height
+
+    return LeftBar
 
 # 判断是否包含中文
 def is_chinese(text: str) -> bool:
     return bool(re.search(r'[\u4e00-\u9fff]', text))
 
+def _summary_of(it: dict) -> str:
+    return it.get('summary_generated') or it.get('summary') or ''
+
+
+def render_markdown(title: str, grouped: Dict[str, List[dict]]) -> str:
+    """轻量 Markdown 报告，不依赖 ReportLab 排版。"""
+    lines = [f"# {title}", ""]
+    for cat, items in grouped.items():
+        lines += [f"## {cat}", ""]
+        for it in items:
+            lines.append(f"### {it.get('title', '')}")
+            lines.append("")
+            summary = _summary_of(it)
+            if summary:
+                lines += [summary, ""]
+            link = it.get('link', '')
+            if link:
+                lines += [f"<{link}>", ""]
+    return "\n".join(lines)
+
+
+def render_html(title: str, grouped: Dict[str, List[dict]]) -> str:
+    """轻量 HTML 报告，样式与 PDF 版保持一致。"""
+    esc = html.escape
+    parts = [
+        "<!DOCTYPE html>",
+        '<html><head><meta charset="utf-8">',
+        f"<title>{esc(title)}</title>",
+        "<style>body{max-width:760px;margin:2em auto;font-family:sans-serif;line-height:1.6;color:#222}"
+        "h2{background:#4B7BFA;color:#fff;padding:6px}"
+        ".item{border-left:3px solid #4B7BFA;padding-left:10px;margin-bottom:14px}"
+        ".item a{color:#1a0dab}</style>",
+        "</head><body>",
+        f"<h1>{esc(title)}</h1>",
+    ]
+    for cat, items in grouped.items():
+        parts.append(f"<h2>{esc(cat)}</h2>")
+        for it in items:
+            parts.append('<div class="item">')
+            parts.append(f"<h3>{esc(it.get('title', ''))}</h3>")
+            summary = _summary_of(it)
+            if summary:
+                parts.append(f"<p>{esc(summary)}</p>")
+            link = it.get('link', '')
+            if link:
+                parts.append(f'<p><a href="{esc(link, quote=True)}">{esc(link)}</a></p>')
+            parts.append("</div>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def _format_of(filename: str) -> str:
+    ext = os.path.splitext(filename)[1].lower()
+    return {".md": "md", ".html": "html", ".htm": "html"}.get(ext, "pdf")
+
+
 class Reporter:
     def __init__(self, filename: str = "report.pdf"):
         self.filename = filename
 
-    def generate(self, title: str, grouped: Dict[str, List[dict]]):
+    def generate(self, title: str, grouped: Dict[str, List[dict]]) -> float:
+        """
+        按文件扩展名选择格式：.md 为 Markdown，.html/.htm 为 HTML，其余为 PDF。
+        返回渲染耗时（秒）。
+        """
+        start = time.perf_counter()
+        fmt = _format_of(self.filename)
+        if fmt != "pdf":
+            render = render_markdown if fmt == "md" else render_html
+            with open(self.filename, "w", encoding="utf-8") as f:
+                f.write(render(title, grouped))
+        else:
+            self._generate_pdf(title, grouped)
+        elapsed = time.perf_counter() - start
+        metrics.RENDER_SECONDS.observe(elapsed, format=_format_of(self.filename))
+        log.info(f"报告 {self.filename} 渲染耗时 {elapsed:.2f}s")
+        return elapsed
+
+    def _generate_pdf(self, title: str, grouped: Dict[str, List[dict]]):
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+        from reportlab.lib.units import mm
+
+        styles = get_styles()
+        LeftBar = _left_bar_class()
         doc = SimpleDocTemplate(
             self.filename,
             pagesize=(210*mm,297*mm),
@@ -85,6 +190,52 @@ class Reporter:
 
         doc.build(story)
 
+
+def _render_job(job: Tuple[str, Dict[str, List[dict]], str]) -> Tuple[str, float]:
+    title, grouped, filename = job
+    return filename, Reporter(filename).generate(title, grouped)
+
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+_render_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """
+    进程内共享的渲染进程池，首次需要时才创建，之后的批量渲染复用已经导入 ReportLab 的子进程。
+    与解析进程池一样使用 spawn 启动。
+    """
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(
+                max_workers=settings.render_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            atexit.register(_render_pool.shutdown, cancel_futures=True)
+        return _render_pool
+
+
+def render_batch(jobs: List[Tuple[str, Dict[str, List[dict]], str]],
+                 workers: Optional[int] = None) -> List[Tuple[str, float]]:
+    """
+    批量渲染多份报告，jobs 为 (title, grouped, filename) 列表，返回每份报告的 (filename, 耗时秒数)，顺序与 jobs 一致。
+    ReportLab 排版是纯 CPU 计算，多份 PDF 交给共享的渲染进程池并行；
+    Markdown/HTML 只是拼接字符串，只有一份 PDF 或 workers <= 1 时也直接在当前进程渲染。
+    """
+    workers = min(workers or settings.render_workers, len(jobs))
+    start = time.perf_counter()
+    pdf = [i for i, job in enumerate(jobs) if _format_of(job[2]) == "pdf"]
+    offload = set(pdf) if workers > 1 and len(pdf) > 1 else set()
+    futures = {i: get_render_pool().submit(_render_job, jobs[i]) for i in offload}
+    results = [None if i in offload else _render_job(job) for i, job in enumerate(jobs)]
+    for i, future in futures.items():
+        results[i] = future.result()
+        # 子进程中记录的指标不会传回，按返回的耗时补记
+        metrics.RENDER_SECONDS.observe(results[i][1], format="pdf")
+    log.info(f"批量渲染 {len(jobs)} 份报告（{len(offload)} 份在进程池中），总耗时 {time.perf_counter() - start:.2f}s")
+    return results
+
 # ---------------- 示例运行 ----------------
 if __name__ == "__main__":
     reporter = Reporter("test_report_clickable.pdf")
@@ -0,0 +1,175 @@
+import argparse
+import random
+import signal
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .config import settings
+from .db import get_all_source_states, update_schedules, save_items
+from .dedup import dedup_items
+from .metrics import SCHEDULER_POLLS, dump_run_metrics
+from .pipeline import prepare_item
+from .seen import filter_incremental, commit_incremental
+from .utils import log
+
+
+def poll_bounds(source: Dict) -> Tuple[float, float, float]:
+    """
+    (初始间隔, 最小间隔, 最大间隔)，YAML 中可按源覆盖：
+        poll: {interval: 900, min: 300, max: 7200}
+    """
+    poll = source.get("poll") or {}
+    low = float(poll.get("min", settings.scheduler_min_interval))
+    high = max(low, float(poll.get("max", settings.scheduler_max_interval)))
+    interval = min(high, max(low, float(poll.get("interval", settings.scheduler_interval))))
+    return interval, low, high
+
+
+def next_interval(interval: float, new: int, low: float, high: float) -> float:
+    """有新链接就缩短间隔，没有就延长，限制在 [low, high] 内。"""
+    factor = settings.scheduler_speedup if new > 0 else settings.scheduler_backoff
+    return min(high, max(low, interval * factor))
+
+
+def jittered(interval: float) -> float:
+    j = settings.scheduler_jitter
+    return interval * random.uniform(1 - j, 1 + j)
+
+
+class Scheduler:
+    """
+    常驻的定时抓取：每个新闻源有自己的轮询间隔和下次抓取时间，到期的源一起抓取，
+    新条目经过去重、增量过滤、摘要后入库。间隔按每次抓到的新链接数自适应（见 next_interval），
+    状态写入 source_state 表，重启后继续按原来的节奏运行。
+    新闻源列表每轮重新读取，YAML 中新增或删除的源会自动生效。
+    """
+
+    def __init__(self, get_sources: Optional[Callable[[], List[Dict]]] = None, fetcher=None, summarizer=None):
+        from .tools.registry import get_sources as registry_sources, get_fetcher, get_summarizer
+
+        self.get_sources = get_sources or registry_sources
+        self.fetcher = fetcher or get_fetcher()
+        self.summarizer = summarizer or get_summarizer()
+        # {source url: [轮询间隔, 下次抓取时间]}
+        self.schedule: Dict[str, List[float]] = {}
+        self._stop = threading.Event()
+
+    def load(self):
+        """从数据库恢复调度状态；没有记录的源在初始间隔的 jitter 范围内错开首次抓取。"""
+        now = time.time()
+        states = get_all_source_states()
+        for source in self.get_sources():
+            url = source["url"]
+            if url in self.schedule:
+                continue
+            interval, low, high = poll_bounds(source)
+            state = states.get(url)
+            if state and state.poll_interval and state.next_poll_at:
+                self.schedule[url] = [min(high, max(low, state.poll_interval)), state.next_poll_at]
+            else:
+                self.schedule[url] = [interval, now + random.uniform(0, interval * settings.scheduler_jitter)]
+
+    def due(self, now: Optional[float] = None) -> Tuple[List[Dict], float]:
+        """返回 (到期的源, 距离下一个源到期的秒数)，最多 settings.scheduler_batch 个，最早到期的优先。"""
+        now = now or time.time()
+        sources = {s["url"]: s for s in self.get_sources()}
+        for url in set(self.schedule) - set(sources):
+            del self.schedule[url]
+        if set(sources) - set(self.schedule):
+            self.load()
+        ready = sorted((self.schedule[url][1], url) for url in sources if self.schedule[url][1] <= now)
+        batch = [sources[url] for _, url in ready[:settings.scheduler_batch]]
+        pending = [self.schedule[url][1] for url in sources if self.schedule[url][1] > now]
+        wait = min(pending) - now if pending else settings.scheduler_min_interval
+        return batch, wait
+
+    def poll(self, sources: List[Dict]) -> Dict[str, int]:
+        """抓取一批源并入库，返回各源的新条目数，然后更新这些源的间隔和下次抓取时间。"""
+        urls = [s["url"] for s in sources]
+        try:
+            raw = self.fetcher.fetch_from_sources(sources)
+            items = [prepare_item(r) for r in raw]
+            items, _ = dedup_items(items)
+            items, _ = filter_incremental(items)
+            if settings.full_text:
+                self.fetcher.fetch_bodies(items)
+            items = self.summarizer.batch_summarize(items)
+            save_items(items)
+            commit_incremental(items, urls)
+        except Exception as e:
+            # 出错时保持原间隔重试，不据此调整节奏
+            log.error(f"定时抓取失败 ({len(urls)} 个源): {e}")
+            SCHEDULER_POLLS.inc(len(urls), result="error")
+            self._reschedule({url: None for url in urls}, sources)
+            return {}
+
+        counts = Counter(it.get("source") for it in items)
+        new = {url: counts.get(url, 0) for url in urls}
+        for n in new.values():
+            SCHEDULER_POLLS.inc(result="new" if n else "empty")
+        self._reschedule(new, sources)
+        return new
+
+    def _reschedule(self, new: Dict[str, Optional[int]], sources: List[Dict]):
+        now = time.time()
+        updates = {}
+        for source in sources:
+            url = source["url"]
+            _, low, high = poll_bounds(source)
+            interval = self.schedule[url][0]
+            n = new.get(url)
+            if n is not None:
+                interval = next_interval(interval, n, low, high)
+            next_at = now + jittered(interval)
+            self.schedule[url] = [interval, next_at]
+            updates[url] = (interval, next_at, n or 0)
+            log.info(f"{source.get('name') or url}: 新条目 {n if n is not None else '-'}，"
+                     f"下次抓取间隔 {interval / 60:.1f} 分钟")
+        update_schedules(updates)
+
+    def run_once(self) -> Dict[str, int]:
+        """抓取当前所有到期的源（可能分多批）后返回，适合由 cron 调用。"""
+        self.load()
+        result: Dict[str, int] = {}
+        while not self._stop.is_set():
+            batch, _ = self.due()
+            if not batch:
+                break
+            result.update(self.poll(batch))
+        dump_run_metrics()
+        return result
+
+    def run_forever(self):
+        self.load()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        log.info(f"定时抓取已启动：{len(self.schedule)} 个新闻源")
+        while not self._stop.is_set():
+            batch, wait = self.due()
+            if batch:
+                self.poll(batch)
+                dump_run_metrics()
+            else:
+                # 最多睡 60 秒，以便及时发现 YAML 中新增的源
+                self._stop.wait(min(max(wait, 1.0), 60.0))
+        log.info("定时抓取已停止")
+
+    def stop(self):
+        self._stop.set()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按自适应间隔定时抓取新闻源")
+    parser.add_argument("--once", action="store_true", help="只抓取当前到期的源，然后退出")
+    args = parser.parse_args()
+
+    scheduler = Scheduler()
+    try:
+        if args.once:
+            scheduler.run_once()
+        else:
+            scheduler.run_forever()
+    except KeyboardInterrupt:
+        scheduler.stop()
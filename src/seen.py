@@ -0,0 +1,117 @@
+import math
+import hashlib
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from .db import link_hash, iter_link_hashes, count_news, existing_link_hashes, get_watermarks, update_watermarks
+from .ranker import parse_published
+from .utils import log
+
+
+class BloomFilter:
+    """定长位数组的布隆过滤器，用双重哈希模拟 k 个哈希函数。"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class SeenLinks:
+    """
+    已处理链接集合：启动时从 news 表的 link_hash 加载布隆过滤器。
+    过滤器判定"未见过"的一定是新链接；判定"可能见过"的再到数据库里确认，排除误判。
+    """
+
+    def __init__(self):
+        count = count_news()
+        self.bloom = BloomFilter(max(100000, count * 2))
+        for h in iter_link_hashes():
+            self.bloom.add(h)
+        self._lock = threading.Lock()
+        log.info(f"增量模式：已加载 {count} 条已处理链接")
+
+    def filter_new(self, items: List[Dict]) -> List[Dict]:
+        hashes = [link_hash(it) for it in items]
+        with self._lock:
+            maybe = {h for h in hashes if h in self.bloom}
+        seen = existing_link_hashes(maybe) if maybe else set()
+        return [it for it, h in zip(items, hashes) if h not in seen]
+
+    def mark(self, items: List[Dict]):
+        """条目入库后调用，让同一进程内后续的过滤立即生效。"""
+        with self._lock:
+            for it in items:
+                self.bloom.add(link_hash(it))
+
+
+_seen: Optional[SeenLinks] = None
+_seen_lock = threading.Lock()
+
+
+def get_seen_links() -> SeenLinks:
+    global _seen
+    with _seen_lock:
+        if _seen is None:
+            _seen = SeenLinks()
+        return _seen
+
+
+def _timestamp(item: Dict) -> Optional[float]:
+    published = parse_published(item.get("published"))
+    return published.timestamp() if published else None
+
+
+def filter_incremental(items: List[Dict]) -> Tuple[List[Dict], int]:
+    """
+    增量过滤，返回 (新条目, 跳过数量)：
+    1. 发布时间不晚于该来源水位（上次见过的最新发布时间）的条目跳过
+    2. 链接已在 news 表中的条目跳过
+    发布时间由 parse_articles 从文章块的 <time>（或 selectors.published）中解析，
+    列表页上没有发布时间的来源只按第 2 条过滤。
+    """
+    watermarks = get_watermarks(it.get("source") for it in items if it.get("source"))
+    fresh = []
+    for it in items:
+        state = watermarks.get(it.get("source"))
+        ts = _timestamp(it)
+        if state and state.last_published and ts and ts <= state.last_published:
+            continue
+        fresh.append(it)
+
+    new_items = get_seen_links().filter_new(fresh)
+    skipped = len(items) - len(new_items)
+    log.info(f"增量模式：{len(items)} 条中 {len(new_items)} 条为新内容，跳过 {skipped} 条")
+    return new_items, skipped
+
+
+def commit_incremental(items: List[Dict], sources: Optional[List[str]] = None,
+                       considered: Optional[List[Dict]] = None):
+    """
+    新条目入库后调用：把入库的 items 加入已见集合，并推进各来源的水位。
+    sources 为本次抓取过的全部来源，没有新条目的来源也会更新 last_run_at。
+    considered 为本次参与挑选的全部新条目（默认等于 items）：只入库其中一部分时（如 news_report 的 top_k），
+    水位按全部参与挑选的条目推进，本次未入选的条目与入选的一样视为已处理，
+    不会出现比入选条目旧的未入选条目被水位跳过、较新的却在下次重新出现的情况。
+    """
+    get_seen_links().mark(items)
+    latest: Dict[str, float] = {s: 0.0 for s in sources or []}
+    for it in considered if considered is not None else items:
+        source = it.get("source")
+        if source:
+            latest[source] = max(latest.get(source, 0.0), _timestamp(it) or 0.0)
+    update_watermarks(latest, time.time())
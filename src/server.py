@@ -0,0 +1,224 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+
+from .config import settings
+from .db import init_db
+from .metrics import REGISTRY
+from .utils import log
+
+
+# ----------------------
+# 请求 / 响应模型
+# ----------------------
+
+class ReportRequest(BaseModel):
+    query: str
+    top_k: int = Field(5, ge=1, le=7)
+    report_file_name: Optional[str] = None  # 为空时按任务 id 命名，扩展名决定格式（.pdf/.md/.html）
+    incremental: Optional[bool] = None  # 不传时取 settings.incremental
+
+
+class ChatRequest(BaseModel):
+    message: str
+    thread_id: str  # 每个用户 / 会话一个，对话历史按它隔离
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    有界的后台任务队列：最多 workers 个报告同时生成，在途（排队 + 执行中）任务达到 max_pending 个时拒绝新任务。
+    任务状态保存在内存中，只保留最近 history 个已结束的任务。
+    """
+
+    def __init__(self, workers: int, max_pending: int, history: int):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report-job")
+        self.max_pending = max_pending
+        self.history = history
+        self.jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, job_id: Optional[str] = None, **kwargs) -> Dict:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull()
+            self._pending += 1
+            job = {"id": job_id or uuid.uuid4().hex, "status": "queued", "created_at": time.time(),
+                   "started_at": None, "finished_at": None, "result": None, "error": None}
+            self.jobs[job["id"]] = job
+        self.executor.submit(self._run, job, fn, args, kwargs)
+        return dict(job)
+
+    def _run(self, job: Dict, fn, args, kwargs):
+        with self._lock:
+            job["status"], job["started_at"] = "running", time.time()
+        try:
+            result, status, error = fn(*args, **kwargs), "done", None
+        except Exception as e:
+            log.error(f"报告任务 {job['id']} 失败: {e}")
+            result, status, error = None, "failed", str(e)
+        with self._lock:
+            job.update(status=status, result=result, error=error, finished_at=time.time())
+            self._pending -= 1
+            self._trim()
+
+    def _trim(self):
+        finished = [jid for jid, j in self.jobs.items() if j["status"] in ("done", "failed")]
+        for jid in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[jid]
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            running = sum(j["status"] == "running" for j in self.jobs.values())
+            return {"pending": self._pending, "running": running, "queued": self._pending - running}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _State:
+    jobs: Optional[JobQueue] = None
+    agent = None
+    agent_lock = threading.Lock()
+    chat_slots: Optional[asyncio.Semaphore] = None
+
+
+state = _State()
+
+
+def _warm_up():
+    """预先创建共享的抓取器、模型客户端、新闻源索引和 PDF 字体，首个请求不再承担这些开销。"""
+    from .tools.registry import get_fetcher, get_summarizer, get_selector, get_source_matcher
+    from .reporter import get_styles
+
+    start = time.perf_counter()
+    init_db()
+    get_source_matcher().sources
+    get_fetcher()
+    get_summarizer()
+    get_selector()
+    get_styles()
+    log.info(f"服务预热完成，耗时 {time.perf_counter() - start:.2f}s")
+
+
+def get_agent():
+    """对话 agent 依赖 GOOGLE_API_KEY，第一次对话时才创建，之后所有会话共用（历史按 thread_id 区分）。"""
+    if state.agent is None:
+        with state.agent_lock:
+            if state.agent is None:
+                from .llm_agent import build_news_agent
+                state.agent = build_news_agent()
+    return state.agent
+
+
+def _report_path(job_name: str, filename: Optional[str]) -> str:
+    """每个任务的报告放在 settings.report_dir/<job_name>/ 下，同名文件的任务互不覆盖；只取文件名部分。"""
+    name = os.path.basename((filename or "").replace("\\", "/")) or "report.pdf"
+    if name in (".", ".."):
+        raise HTTPException(status_code=422, detail=f"无效的报告文件名: {filename}")
+    job_dir = os.path.join(settings.report_dir, job_name)
+    os.makedirs(job_dir, exist_ok=True)
+    return os.path.abspath(os.path.join(job_dir, name))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    state.jobs = JobQueue(settings.server_workers, settings.server_queue_size, settings.server_job_history)
+    state.chat_slots = asyncio.Semaphore(settings.chat_concurrency)
+    await asyncio.to_thread(_warm_up)
+    yield
+    state.jobs.shutdown()
+    from .tools.registry import close_instances
+    close_instances()
+
+
+app = FastAPI(title="News Agent", lifespan=lifespan)
+
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok", "jobs": state.jobs.stats()}
+
+
+@app.post("/reports", status_code=202)
+async def create_report(req: ReportRequest):
+    """提交报告任务，立即返回任务 id，之后用 GET /reports/{id} 轮询状态。"""
+    from .tools.news_report_tool import run_news_report
+
+    job_id = uuid.uuid4().hex
+    path = _report_path(job_id, req.report_file_name)
+    try:
+        job = state.jobs.submit(run_news_report, req.query, req.top_k, path, req.incremental, job_id=job_id)
+    except JobQueueFull:
+        os.rmdir(os.path.dirname(path))
+        raise HTTPException(status_code=429, detail="报告任务队列已满，请稍后重试")
+    return job
+
+
+@app.get("/reports/{job_id}")
+async def get_report(job_id: str):
+    job = state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
+
+
+@app.get("/reports/{job_id}/file")
+async def get_report_file(job_id: str):
+    job = state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"任务状态为 {job['status']}")
+    if not job["result"] or not os.path.exists(job["result"]):
+        raise HTTPException(status_code=404, detail="没有生成报告（可能没有匹配的新闻源）")
+    return FileResponse(job["result"], filename=os.path.basename(job["result"]))
+
+
+@app.post("/chat")
+async def chat(req: ChatRequest):
+    """与新闻 agent 对话。agent 调用是阻塞的，放到线程中执行，并发数受 settings.chat_concurrency 限制。"""
+    from .llm_agent import extract_reply
+
+    async with state.chat_slots:
+        try:
+            agent = await asyncio.to_thread(get_agent)
+            res = await asyncio.to_thread(
+                agent.invoke,
+                {"messages": [{"role": "user", "content": req.message}]},
+                {"configurable": {"thread_id": req.thread_id}},
+            )
+        except Exception as e:
+            log.error(f"对话失败 (thread {req.thread_id}): {e}")
+            raise HTTPException(status_code=502, detail=str(e))
+    return {"thread_id": req.thread_id, "reply": extract_reply(res)}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=settings.server_host, port=settings.server_port)
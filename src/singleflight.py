@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    请求合并 + TTL 结果缓存：
+    - 同一 key 的并发调用只执行一次 fn，其余调用等待并共享同一个结果（或异常）
+    - 成功的结果在 ttl 秒内直接复用，最多保留 max_entries 个，超出时淘汰最久未用的
+    ttl 为 0 时只合并并发调用，不缓存。
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 64):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, str]:
+        """返回 (结果, 来源)，来源为 "hit"（缓存）、"coalesced"（等待他人执行）或 "miss"（本次执行）。"""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._cache.move_to_end(key)
+                return entry[1], "hit"
+            if entry:
+                del self._cache[key]
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            return future.result(), "coalesced"
+
+        try:
+            value = fn()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._inflight[key]
+            if self.ttl > 0:
+                self._cache[key] = (time.monotonic() + self.ttl, value)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        future.set_result(value)
+        return value, "miss"
+
+    def invalidate(self, key: Hashable = None):
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Set
+from .utils import log
+
+
+class AhoCorasick:
+    """
+    多模式串匹配自动机：一次扫描查询文本即可找出其中出现的全部模式串，
+    耗时与查询长度（加命中数）成正比，与模式串数量无关。
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[int]] = [[]]
+        for pid, pattern in enumerate(patterns):
+            self._add(pattern, pid)
+        self._build()
+
+    def _add(self, pattern: str, pid: int):
+        state = 0
+        for ch in pattern:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            state = nxt
+        self.out[state].append(pid)
+
+    def _build(self):
+        # BFS 计算失配指针，并把失配链上的输出合并进来
+        q = deque(self.goto[0].values())
+        while q:
+            state = q.popleft()
+            for ch, nxt in self.goto[state].items():
+                q.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0) if state else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def search(self, text: str) -> Set[int]:
+        """返回 text 中出现过的模式串编号。"""
+        found: Set[int] = set()
+        state = 0
+        for ch in text:
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            if self.out[state]:
+                found.update(self.out[state])
+        return found
+
+
+class _SourceIndex:
+    """某一版 YAML 对应的不可变索引，重建时整体替换。"""
+
+    def __init__(self, sources: List[dict], mtime: float):
+        self.sources = sources
+        self.mtime = mtime
+        keywords: Dict[str, Set[int]] = {}
+        for i, source in enumerate(sources):
+            for kw in [source.get("name"), *(source.get("tags") or [])]:
+                kw = str(kw or "").strip().lower()
+                if kw:
+                    keywords.setdefault(kw, set()).add(i)
+        self.patterns = list(keywords)
+        self.targets: List[Set[int]] = [keywords[p] for p in self.patterns]
+        self.automaton = AhoCorasick(self.patterns)
+
+    def match(self, query: str) -> List[dict]:
+        hits: Set[int] = set()
+        for pid in self.automaton.search(query.lower()):
+            hits |= self.targets[pid]
+        # 按 YAML 中的顺序返回
+        return [self.sources[i] for i in sorted(hits)]
+
+
+class SourceMatcher:
+    """
+    根据查询匹配新闻源：查询中出现来源 name 或任一 tag（不区分大小写）即命中。
+    YAML 文件修改时间变化后自动重新加载并原子替换索引，无需重启进程。
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        """
+        :param check_interval: 两次检查文件修改时间的最小间隔（秒）
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self._index: Optional[_SourceIndex] = None
+        self._checked_at = 0.0
+        self._failed_mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _load(self, mtime: float) -> _SourceIndex:
+        import yaml
+
+        # 读取 YAML 文件
+        with open(self.path, "r", encoding="utf-8") as f:
+            sources = yaml.safe_load(f) or []
+        index = _SourceIndex(sources, mtime)
+        log.info(f"新闻源索引已加载：{len(sources)} 个来源，{len(index.patterns)} 个关键词")
+        return index
+
+    def _current(self) -> _SourceIndex:
+        index = self._index
+        now = time.monotonic()
+        if index is not None and now - self._checked_at < self.check_interval:
+            return index
+        with self._lock:
+            index = self._index
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError as e:
+                if index is None:
+                    raise
+                log.warning(f"无法读取新闻源文件 {self.path}，继续使用旧索引: {e}")
+                return index
+            if index is None or (mtime != index.mtime and mtime != self._failed_mtime):
+                try:
+                    index = self._index = self._load(mtime)
+                except Exception as e:
+                    if index is None:
+                        raise
+                    # 编辑中途的半成品 YAML 不应让服务失效，同一版本只报一次错
+                    self._failed_mtime = mtime
+                    log.error(f"新闻源文件解析失败，继续使用旧索引: {e}")
+        return index
+
+    @property
+    def sources(self) -> List[dict]:
+        return self._current().sources
+
+    def match(self, query: str) -> List[dict]:
+        return self._current().match(query)
+
@@ -1,33 +1,112 @@
-from typing import List
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage
+from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import threading
 from .config import settings
-from .utils import log
+from .llm import InvalidReply, ModelCascade, get_rate_limiter, invoke_llm, llm_breaker_key
+from . import metrics
+from .db import get_cached_summaries, put_cached_summaries
+from .dedup import canonicalize_url
+from .compressor import fit_to_budget
+from .utils import log, retry, estimate_tokens
 import re
 import json
 
+CATEGORIES = [
+    "科技", "财经", "商业", "国际", "时政", "社会",
+    "健康", "医疗", "娱乐", "体育", "汽车", "出行",
+    "科普", "生活方式", "其他"
+]
+
+
+def strip_code_fence(content: str) -> str:
+    # 去除可能的代码块标记
+    return re.sub(r"^```(?:json)?\s*|\s*```$", "", content.strip(), flags=re.IGNORECASE)
+
+
+def source_text(it: dict) -> str:
+    """送给模型的原文：抓到正文时用正文（text），否则用列表页摘要，空白合并为单个空格。"""
+    return " ".join((it.get("text") or it.get("summary") or "").split())
+
+
+def _compressed(text: str):
+    return fit_to_budget(text, settings.summary_input_tokens, settings.summary_compression)
+
+
+def prompt_text(text: str) -> str:
+    """放进提示词的原文：超过 settings.summary_input_tokens 时按 settings.summary_compression 压缩。"""
+    return _compressed(text).text
+
+
+def _valid_categories(categories) -> List[str]:
+    if not isinstance(categories, list) or not all(cat in CATEGORIES for cat in categories):
+        return ["其他"]
+    return categories
+
+
+class SummaryStats(dict):
+    """一次 batch_summarize 调用的统计，由该调用内的多个线程累加；每次调用各自一份，共享的 Summarizer 上并发的任务互不干扰。"""
+
+    KEYS = ("articles", "llm_calls", "prompt_tokens", "cache_hits", "cache_misses",
+            "input_tokens", "sent_tokens", "compressed")
+
+    def __init__(self):
+        super().__init__(dict.fromkeys(self.KEYS, 0))
+        self._lock = threading.Lock()
+
+    def add(self, **kwargs):
+        with self._lock:
+            for k, v in kwargs.items():
+                self[k] += v
+
+
 class Summarizer:
-    def __init__(self, model: str = "gemini-2.5-pro"):
-        # 初始化 LangChain 的 Gemini 接口
-        self.model = ChatGoogleGenerativeAI(
-            model=model,
-            google_api_key=settings.google_api_key,
-            temperature=0.2,
-            max_output_tokens=4096,
-        )
+    def __init__(self, model: Optional[str] = None, llm=None, fast_model: Optional[str] = None, fast_llm=None):
+        """
+        :param model: 强模型名称，默认 settings.llm_strong_model
+        :param llm: 可选，直接注入的聊天模型（如 llm.FakeChatModel），用于离线测试
+        :param fast_model / fast_llm: 级联中的快模型，默认 settings.llm_fast_model
+        """
+        # 初始化 LangChain 的 Gemini 接口（快 / 强两级）
+        self.cascade = ModelCascade("summarize", model, fast_model, llm=llm, fast_llm=fast_llm,
+                                    temperature=0.2, max_output_tokens=4096)
+        self.model_name = self.cascade.name
+        self.limiter = get_rate_limiter()
+
+    @retry(times=3, delay=2, deadline=settings.llm_deadline, breaker_key=llm_breaker_key)
+    def _invoke(self, model, prompt: str, max_tokens: int = 512, model_name: str = "",
+                stats: Optional[SummaryStats] = None):
+        # 按输入 + 预计输出的 token 数限流
+        prompt_tokens = estimate_tokens(prompt)
+        self.limiter.acquire(prompt_tokens + max_tokens)
+        if stats is not None:
+            stats.add(llm_calls=1, prompt_tokens=prompt_tokens)
+        return invoke_llm(model, prompt, "summarize", prompt_tokens, model_name)
 
     def summarize(self, title: str, summary: str, link: str = "", max_tokens: int = 512):
+        """单篇摘要，与 batch_summarize 共用摘要缓存。"""
         if not summary:
-            return "", "其他"
+            return "", ["其他"]
+        key = self.cache_key({"title": title, "summary": summary, "link": link}) if settings.summary_cache else None
+        hit = self._cache_get([key]).get(key) if key else None
+        if hit:
+            return hit
+        res = self._try_summarize(title, summary, link, max_tokens)
+        if res is None:
+            return self._fallback(summary)
+        if key:
+            self._cache_put({key: res})
+        return res
 
-        categories = [
-            "科技", "财经", "商业", "国际", "时政", "社会",
-            "健康", "医疗", "娱乐", "体育", "汽车", "出行",
-            "科普", "生活方式", "其他"
-        ]
+    @staticmethod
+    def _fallback(summary: str) -> Tuple[str, List[str]]:
+        return summary[:400].strip(), ["其他"]
 
+    def _try_summarize(self, title: str, summary: str, link: str = "", max_tokens: int = 512,
+                       stats: Optional[SummaryStats] = None) -> Optional[Tuple[str, List[str]]]:
+        """单篇摘要，失败时返回 None，由调用方决定是否回退（失败结果不写入缓存）。"""
         prompt = f"""
-                    请用{settings.default_language}根据链接丰富摘要并判断类别。
+                    请用{settings.default_language}根据原文生成摘要并判断类别，原文较短时可参考链接补充。
 
                     要求：
                     1. 只输出 JSON：
@@ -35,46 +114,213 @@ class Summarizer:
                     "summary": "...",        # 3-5句话摘要，保留主体、关键信息和时间，如有信息无法获取，可以不展示，不要有不确定的内容
                     "categories": ["..."]    # 从指定列表选择最合适的类别
                     }}
-                    2. 类别列表（只能选择其中的）：{categories}
-                    3. 原文标题、摘要和链接如下，请直接生成 JSON：
+                    2. 类别列表（只能选择其中的）：{CATEGORIES}
+                    3. 新闻标题、原文和链接如下，请直接生成 JSON：
                     标题：{title}
-                    原始摘要：{summary[:3000]}
+                    原文：{prompt_text(summary)}
                     链接：{link}
                     """
 
 
 
-        try:
-            response = self.model.invoke([HumanMessage(content=prompt)])
-            content = response.content.strip()
-            # 去除可能的代码块标记
-            cleaned_content = re.sub(r"^```(?:json)?\s*|\s*```$", "", content.strip(), flags=re.IGNORECASE)
+        def parse(response) -> Tuple[str, List[str]]:
             # 提取 JSON 部分
-            data = json.loads(cleaned_content)
-
+            data = json.loads(strip_code_fence(response.content))
             summary_final = data.get("summary", "").strip()
-            categories_final = data.get("categories", [])
-
-            allowed = set(categories)
-            if not all(cat in allowed for cat in categories_final):
-                categories_final = ["其他"]
+            if not summary_final:
+                raise ValueError("empty summary")
+            categories_final = _valid_categories(data.get("categories", []))
             return summary_final, categories_final
 
+        try:
+            # 先用快模型，回复无效或原文很长时用强模型；
+            # 送出的原文已压缩到 summary_input_tokens 以内，按压缩前的长度判断
+            return self.cascade.run(
+                lambda model, name: self._invoke(model, prompt, max_tokens, model_name=name, stats=stats),
+                parse, _compressed(summary).original_tokens)
         except Exception as e:
             log.error(f"Summarize error: {e}")
-            return summary[:400].strip(), ["其他"]
+            return None
+
+    @staticmethod
+    def _batch_entry(i: int, it: dict) -> str:
+        return f"[{i}] 标题：{it.get('title', '')}\n原文：{prompt_text(source_text(it))}\n链接：{it.get('link', '')}\n"
 
+    def _build_batch_prompt(self, batch: List[dict]) -> str:
+        entries = "\n".join(self._batch_entry(i, it) for i, it in enumerate(batch))
+        return f"""
+                    请用{settings.default_language}为下面每条新闻根据原文生成摘要并判断类别，原文较短时可参考链接补充。
 
-    def batch_summarize(self, items: List[dict]) -> List[dict]:
-        out = []
+                    要求：
+                    1. 只输出 JSON 数组，每条新闻对应一个元素，用 index 标明新闻编号：
+                    [{{"index": 0, "summary": "...", "categories": ["..."]}}]
+                    summary 为 3-5句话摘要，保留主体、关键信息和时间，如有信息无法获取，可以不展示，不要有不确定的内容；
+                    categories 从指定列表选择最合适的类别
+                    2. 类别列表（只能选择其中的）：{CATEGORIES}
+                    3. 新闻列表如下，请直接生成 JSON：
+{entries}"""
+
+    def pack_batches(self, items: List[dict], batch_size: Optional[int] = None,
+                     budget: Optional[int] = None) -> List[List[dict]]:
+        """
+        按条数上限 batch_size 和输入 token 预算 budget 把文章贪心打包。
+        单条超过预算时单独成批。
+        """
+        batch_size = batch_size or settings.summary_batch_size
+        budget = budget or settings.summary_batch_tokens
+        batches, current, used = [], [], 0
         for it in items:
-            summary = it.get("summary") or ""
-            link = it.get("link", "")
-            summarized, categories = self.summarize(it.get("title", ""), summary, link)
-            it["summary_generated"] = summarized
-            it["categories"] = categories
-            out.append(it)
-        return out
+            cost = estimate_tokens(self._batch_entry(0, it))
+            if current and (len(current) >= batch_size or used + cost > budget):
+                batches.append(current)
+                current, used = [], 0
+            current.append(it)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    def summarize_batch(self, batch: List[dict], max_tokens_per_item: int = 384,
+                        stats: Optional[SummaryStats] = None) -> List[Optional[tuple]]:
+        """
+        一次请求摘要多条新闻，返回与 batch 等长的 (summary, categories) 列表，失败的条目为 None。
+        模型返回的 JSON 无效或缺条目时，把这一批对半拆开递归重试，拆到单条时退回到单篇提示词；
+        调用本身失败（超时、熔断等）时不拆分，整批返回 None，避免一次故障放大成大量请求。
+        """
+        if len(batch) == 1:
+            it = batch[0]
+            return [self._try_summarize(it.get("title", ""), source_text(it), it.get("link", ""), stats=stats)]
+
+        def parse(response) -> List[tuple]:
+            data = json.loads(strip_code_fence(response.content))
+            by_index = {int(d["index"]): d for d in data}
+            if set(by_index) != set(range(len(batch))):
+                raise ValueError(f"expected {len(batch)} entries, got indices {sorted(by_index)}")
+            out = []
+            for i in range(len(batch)):
+                summary_final = str(by_index[i].get("summary") or "").strip()
+                if not summary_final:
+                    # 与单篇一样视为无效回复，交给强模型重做或拆分，不把空摘要写进缓存
+                    raise ValueError(f"empty summary for index {i}")
+                out.append((summary_final, _valid_categories(by_index[i].get("categories", []))))
+            return out
+
+        prompt = self._build_batch_prompt(batch)
+        max_tokens = max_tokens_per_item * len(batch)
+        try:
+            # 是否直接用强模型取决于最长的一篇原文（压缩前）的长度，而不是整批的长度
+            return self.cascade.run(
+                lambda model, name: self._invoke(model, prompt, max_tokens, model_name=name, stats=stats),
+                parse, max(_compressed(source_text(it)).original_tokens for it in batch))
+        except InvalidReply as e:
+            log.warning(f"Batch summarize of {len(batch)} items returned an invalid reply, splitting: {e}")
+            mid = len(batch) // 2
+            return (self.summarize_batch(batch[:mid], max_tokens_per_item, stats)
+                    + self.summarize_batch(batch[mid:], max_tokens_per_item, stats))
+        except Exception as e:
+            log.error(f"Batch summarize of {len(batch)} items failed: {e}")
+            return [None] * len(batch)
+
+    def cache_key(self, it: dict) -> str:
+        """缓存 key：规范化链接 + 标题与原文的哈希 + 模型 + 语言 + prompt 版本。"""
+        content = hashlib.sha256(f"{it.get('title', '')}\n{source_text(it)}".encode("utf-8")).hexdigest()
+        raw = "|".join([canonicalize_url(it.get("link", "")), content, self.model_name,
+                        settings.default_language, settings.prompt_version])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _cache_get(keys) -> dict:
+        try:
+            return get_cached_summaries(keys)
+        except Exception as e:
+            log.warning(f"Summary cache read failed: {e}")
+            return {}
+
+    @staticmethod
+    def _cache_put(entries: dict):
+        try:
+            put_cached_summaries(entries)
+        except Exception as e:
+            log.warning(f"Summary cache write failed: {e}")
+
+    def _compress(self, items: List[dict], stats: SummaryStats):
+        """预先压缩各条原文（结果有缓存，构造提示词时直接复用），并统计压缩前后的 token 数。"""
+        original = sent = compressed = 0
+        for it in items:
+            res = _compressed(source_text(it))
+            original += res.original_tokens
+            sent += res.tokens
+            compressed += res.compressed
+        stats.add(input_tokens=original, sent_tokens=sent, compressed=compressed)
+        metrics.SUMMARY_INPUT_TOKENS.inc(original, kind="original")
+        metrics.SUMMARY_INPUT_TOKENS.inc(sent, kind="sent")
+
+    def _run(self, items: List[dict], concurrency: int, batch_size: int, stats: SummaryStats) -> List[Optional[tuple]]:
+        """对 items 调用模型，返回与之等长的结果列表（失败为 None）。"""
+        self._compress(items, stats)
+        if batch_size > 1:
+            work = self.pack_batches(items, batch_size)
+            fn = lambda batch: self.summarize_batch(batch, stats=stats)
+        else:
+            work = items
+            fn = lambda it: self._try_summarize(it.get("title", ""), source_text(it), it.get("link", ""), stats=stats)
+
+        if concurrency <= 1 or len(work) <= 1:
+            done = [fn(w) for w in work]
+        else:
+            with ThreadPoolExecutor(max_workers=min(concurrency, len(work))) as executor:
+                done = list(executor.map(fn, work))
+        return [r for chunk in done for r in chunk] if batch_size > 1 else done
+
+    def batch_summarize(self, items: List[dict], concurrency: Optional[int] = None,
+                        batch_size: Optional[int] = None, stats: Optional[dict] = None) -> List[dict]:
+        """
+        并发摘要，最多 concurrency 个请求同时在途（默认 settings.llm_concurrency），
+        并受共享限流器的 rpm/tpm 约束。输出顺序与输入一致。
+        batch_size > 1 时把多条新闻打包进一个请求（默认 settings.summary_batch_size）。
+        开启 settings.summary_cache 时，命中缓存的条目不调用模型。
+        传入 stats 字典时，本次调用的统计（LLM 调用次数、token 数、缓存命中等）写入其中。
+        """
+        concurrency = concurrency or settings.llm_concurrency
+        batch_size = batch_size or settings.summary_batch_size
+        run_stats = SummaryStats()
+
+        # 没有原文的条目不送给模型
+        pending = [it for it in items if it.get("summary") or it.get("text")]
+        keys, hits = {}, {}
+        if settings.summary_cache and pending:
+            keys = {id(it): self.cache_key(it) for it in pending}
+            hits = self._cache_get(keys.values())
+        todo = [it for it in pending if keys.get(id(it)) not in hits]
+
+        results = dict(zip(map(id, todo), self._run(todo, concurrency, batch_size, run_stats)))
+        fresh = {}
+        for it in items:
+            if not (it.get("summary") or it.get("text")):
+                res = ("", ["其他"])
+            elif id(it) in results:
+                res = results[id(it)]
+                if res is not None and keys:
+                    fresh[keys[id(it)]] = res
+                res = res or self._fallback(it.get("summary") or source_text(it))
+            else:
+                res = hits[keys[id(it)]]
+            it["summary_generated"], it["categories"] = res
+
+        if fresh:
+            self._cache_put(fresh)
+
+        run_stats.add(articles=len(items), cache_hits=len(pending) - len(todo), cache_misses=len(todo))
+        if stats is not None:
+            stats.update(run_stats)
+        if items:
+            log.info(
+                f"摘要完成：{len(items)} 条，缓存命中 {run_stats['cache_hits']} / 未命中 {run_stats['cache_misses']}，"
+                f"LLM 调用 {run_stats['llm_calls']} 次，平均每条输入约 {run_stats['prompt_tokens'] // len(items)} tokens，"
+                f"{run_stats['compressed']} 条原文压缩（{run_stats['input_tokens']} -> {run_stats['sent_tokens']} tokens）"
+                f"（prompt {settings.prompt_version}，batch {batch_size}）"
+            )
+        return items
 
 if __name__ == "__main__":
     summarizer = Summarizer()
@@ -1,87 +1,128 @@
 import os
-import yaml
-from pathlib import Path
-from typing import List
+import shutil
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 from langchain.tools import tool
 from .BaseModel import Article,FetchNewsArgs  
-from ..fetcher import Fetcher
-from ..summarizer import Summarizer
-from ..reporter import Reporter
-from ..article_selector import ArticleSelector
-# 从环境变量读取路径（默认路径为 ../asset/news_sources.yaml）
-SOURCES_FILE = os.getenv(
-    "NEWS_SOURCES_FILE",
-    str(Path(__file__).parent / "../asset/news_sources.yaml")
-)
-# 读取 YAML 文件
-with open(SOURCES_FILE, "r", encoding="utf-8") as f:
-    NEWS_SOURCES = yaml.safe_load(f)
-
-fetcher = Fetcher()
-summarizer = Summarizer()
-selector = ArticleSelector()
-
-
-
-# 工具函数
-def parse_query_to_sources(query: str) -> List[dict]:
+from .registry import parse_query_to_sources, get_fetcher, get_summarizer, get_selector, get_report_flight
+from ..config import settings
+
+
+def _select_and_summarize(query: str, top_k: int, matched_sources: List[dict], incremental: bool) -> Dict[str, List[dict]]:
+    """抓取 -> 去重 ->（增量过滤）-> 挑选 -> 摘要，返回按类别分组的文章。"""
+    from ..dedup import dedup_items
+    from ..seen import filter_incremental, commit_incremental
+    from ..db import save_items
+
+    fetcher, summarizer, selector = get_fetcher(), get_summarizer(), get_selector()
+    results = fetcher.fetch_from_sources(matched_sources)
+    results, _ = dedup_items(results)
+    if incremental:
+        results, _ = filter_incremental(results)
+    articles = []
+    for r in results:
+        articles.append({
+            **Article(
+                title=r.get("title", ""),
+                summary=r.get("summary", ""),
+                link = r.get("link", "")
+            ).model_dump(),
+            # 本地预排序需要来源和发布时间
+            "source": r.get("source"),
+            "published": r.get("published"),
+        })
+    source_weights = {s["url"]: s["weight"] for s in matched_sources if "weight" in s}
+    top_articles = selector.select_top_articles(articles, top_k, query=query, source_weights=source_weights)
+    if settings.full_text:
+        # 只为挑选出的 top_k 条下载正文
+        fetcher.fetch_bodies(top_articles)
+    summarized = summarizer.batch_summarize(top_articles)
+    if incremental:
+        # 入库后才算"已处理"，下次增量运行会跳过
+        save_items(summarized)
+        commit_incremental(summarized, [s["url"] for s in matched_sources], considered=results)
+    formated_summarized = [Article(**a) for a in summarized]
+    grouped = {}
+    for a in formated_summarized:
+        src = a.categories[0] if a.categories else  "其他"
+        grouped.setdefault(src, []).append(a.model_dump())
+    return grouped
+
+
+def _render(grouped: Dict[str, List[dict]], path: str) -> Dict:
+    from ..reporter import Reporter
+
+    Reporter(path).generate("今日新闻报告", grouped)
+    return {"grouped": grouped, "report": path, "mtime": os.path.getmtime(path)}
+
+
+def _materialize(cached: Dict, path: str):
     """
-    根据用户自然语言 query 匹配新闻源
-    优先 name 匹配，如果 name 匹配成功，则不考虑 tag 匹配
+    把缓存的结果落到本次请求的文件上：
+    同一文件且未被改写时直接返回；同格式时复制已渲染的报告；否则用缓存的文章重新渲染。
     """
-    query_lower = query.lower()
-    matched_sources = []
-
-    for source in NEWS_SOURCES:
-        name_match = source["name"].lower() in query_lower
-        if name_match:
-            matched_sources.append(source)
-            continue  # 如果 name 匹配成功，就不检查 tag 了
+    from ..reporter import _format_of
 
-        tag_match = any(tag.lower() in query_lower for tag in source.get("tags", []))
-        if tag_match:
-            matched_sources.append(source)
+    report = cached["report"]
+    try:
+        unchanged = os.path.getmtime(report) == cached["mtime"]
+    except OSError:
+        unchanged = False
+    if unchanged and report == path:
+        return
+    if unchanged and _format_of(report) == _format_of(path):
+        shutil.copyfile(report, path)
+        return
+    _render(cached["grouped"], path)
 
-    return matched_sources
 
-# 工具函数定义
-@tool("news_report", return_direct=False)
-def news_report(query:str,top_k:int,report_file_name:str) -> str:
+def run_news_report(query: str, top_k: int, report_file_name: str, incremental: Optional[bool] = None) -> str:
     """
-    抓取新闻内容自动总结并生成报告。
-    Args:
-        query: keywords or news source names in natural language.
-        top_k: 抓取后选择的前 k 条重要新闻进行总结
-    返回 str，生成的报告文件路径。
+    news_report 工具的实际实现，也供 HTTP 服务直接调用。
     1. 抓取新闻
     2. 总结新闻
     3. 生成报告
-    4. 返回报告文件路径
+    4. 返回报告文件路径（没有匹配的新闻源时返回空字符串）
+
+    匹配到的新闻源集合、规范化后的 query（本地预排序依赖它）、top_k 和语言都相同的请求视为同一请求：并发时只执行一次，
+    结果在 settings.report_cache_ttl 秒内直接复用。增量模式有写库等副作用，不合并也不缓存。
     """
+    # 抓取、数据库、PDF 等重依赖在首次调用时才导入
+    from ..metrics import dump_run_metrics, REPORT_REQUESTS
+
     matched_sources = parse_query_to_sources(query)
 
     if not matched_sources:
         print("No matched news sources for query:", query)
         return ""  # 没匹配到新闻源
 
-    results = fetcher.fetch_from_sources(matched_sources)
-    articles = []
-    for r in results:
-        articles.append(
-            Article(
-                title=r.get("title", ""),
-                summary=r.get("summary", ""),
-                link = r.get("link", "")
-            )
-        )
-    top_articles = selector.select_top_articles([a.model_dump() for a in articles], top_k)
-    summarized = summarizer.batch_summarize(top_articles)
-    formated_summarized = [Article(**a) for a in summarized]
-    reporter = Reporter(report_file_name)
-    grouped = {}
-    for a in formated_summarized:
-        src = a.categories[0] if a.categories else  "其他"
-        grouped.setdefault(src, []).append(a.model_dump())
-    reporter.generate("今日新闻报告", grouped)
-    return os.path.join(os.getcwd(), report_file_name)
\ No newline at end of file
+    path = os.path.join(os.getcwd(), report_file_name)
+    incremental = settings.incremental if incremental is None else incremental
+    if incremental:
+        _render(_select_and_summarize(query, top_k, matched_sources, True), path)
+        REPORT_REQUESTS.inc(result="incremental")
+    else:
+        # query 参与挑选前的本地相关度排序，不同 query 即使匹配到相同新闻源，结果也可能不同
+        normalized_query = " ".join(query.lower().split())
+        key = (tuple(sorted(s["url"] for s in matched_sources)), normalized_query, top_k, settings.default_language)
+        cached, how = get_report_flight().do(
+            key, lambda: _render(_select_and_summarize(query, top_k, matched_sources, False), path))
+        if how != "miss":
+            _materialize(cached, path)
+        REPORT_REQUESTS.inc(result=how)
+    dump_run_metrics()
+    return path
+
+
+# 工具函数定义
+@tool("news_report", return_direct=False)
+def news_report(query:str,top_k:int,report_file_name:str,incremental:Optional[bool]=None) -> str:
+    """
+    抓取新闻内容自动总结并生成报告。
+    Args:
+        query: keywords or news source names in natural language.
+        top_k: 抓取后选择的前 k 条重要新闻进行总结
+        incremental: 为 True 时只处理之前没有处理过的新闻，不传时取 settings.incremental
+    返回 str，生成的报告文件路径。
+    """
+    return run_news_report(query, top_k, report_file_name, incremental)
@@ -0,0 +1,79 @@
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List
+
+# 从环境变量读取路径（默认路径为 ../asset/news_sources.yaml）
+SOURCES_FILE = os.getenv(
+    "NEWS_SOURCES_FILE",
+    str(Path(__file__).parent / "../asset/news_sources.yaml")
+)
+
+# ----------------------
+# 共享实例注册表：首次使用时才创建，所有工具共用同一份，
+# 避免导入工具模块时就读取 YAML、创建 Gemini 客户端、注册字体。
+# ----------------------
+
+_instances: Dict[str, object] = {}
+_lock = threading.RLock()
+
+
+def _get(name: str, factory: Callable[[], object]):
+    inst = _instances.get(name)
+    if inst is None:
+        with _lock:
+            inst = _instances.get(name)
+            if inst is None:
+                inst = _instances[name] = factory()
+    return inst
+
+
+def close_instances():
+    """关闭并清空共享实例（如抓取器的连接池和事件循环），服务退出时调用。"""
+    with _lock:
+        instances = list(_instances.values())
+        _instances.clear()
+    for inst in instances:
+        close = getattr(inst, "close", None)
+        if callable(close):
+            close()
+
+
+def get_source_matcher():
+    from ..source_matcher import SourceMatcher
+    return _get("source_matcher", lambda: SourceMatcher(SOURCES_FILE))
+
+
+def get_sources() -> List[dict]:
+    """当前的新闻源列表，YAML 修改后自动重新加载。"""
+    return get_source_matcher().sources
+
+
+def parse_query_to_sources(query: str) -> List[dict]:
+    """
+    根据用户自然语言 query 匹配新闻源：query 中出现来源 name 或任一 tag 即命中，
+    按 YAML 中的顺序返回。
+    """
+    return get_source_matcher().match(query)
+
+
+def get_fetcher():
+    from ..fetcher import Fetcher
+    return _get("fetcher", Fetcher)
+
+
+def get_summarizer():
+    from ..summarizer import Summarizer
+    return _get("summarizer", Summarizer)
+
+
+def get_selector():
+    from ..article_selector import ArticleSelector
+    return _get("selector", ArticleSelector)
+
+
+def get_report_flight():
+    """news_report 的请求合并与结果缓存（settings.report_cache_ttl / report_cache_max）。"""
+    from ..config import settings
+    from ..singleflight import SingleFlight
+    return _get("report_flight", lambda: SingleFlight(settings.report_cache_ttl, settings.report_cache_max))
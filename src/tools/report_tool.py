@@ -1,5 +1,4 @@
 from langchain.tools import tool
-from ..reporter import Reporter
 
 from pydantic import BaseModel, Field
 from typing import List, Dict, Optional, Union
@@ -13,6 +12,8 @@ def generate_report_pdf(args: GenerateReportArgs) -> str:
     filename (str, optional): 生成的 PDF 文件名，默认为 "news_report.pdf"。 
     Returns: str: 生成的 PDF 文件路径。 
     """
+    from ..reporter import Reporter
+
     reporter = Reporter(args.filename)
     grouped = {}
     for a in args.articles:
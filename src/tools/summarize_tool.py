@@ -1,10 +1,8 @@
 from langchain.tools import tool
-from ..summarizer import Summarizer
 from pydantic import BaseModel
 from typing import List, Dict, Union
 from .BaseModel import SourceItem, Article, SummarizeArticlesArgs
-
-summarizer = Summarizer()
+from .registry import get_summarizer
 
 @tool("summarize_articles", return_direct=False, args_schema=SummarizeArticlesArgs)
 def summarize_articles(articles: List[Article]) -> List[Article]:
@@ -14,7 +12,7 @@ def summarize_articles(articles: List[Article]) -> List[Article]:
     # 将 BaseModel 转 dict（兼容 Pydantic V2）
     articles_data = [a.model_dump() for a in articles]
     # 批量摘要
-    summarized = summarizer.batch_summarize(articles_data)
+    summarized = get_summarizer().batch_summarize(articles_data)
     # 重新构造 Article 对象
     return [Article(**a) for a in summarized]
 
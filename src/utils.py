@@ -1,22 +1,234 @@
 import logging
+import asyncio
+import inspect
+import random
+import re
+import threading
+import time
 from time import sleep
 from functools import wraps
+from typing import Callable, Dict, Optional, Union
+from .config import settings
 
 logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s - %(message)s")
 log = logging.getLogger("news-agent")
+# httpx 每个请求都会打 INFO 日志，抓取量大时过于嘈杂
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态时直接抛出，不再发起请求。"""
+
+
+class CircuitBreaker:
+    """
+    简单的三态熔断器：closed -> open -> half_open。
+    连续失败 failure_threshold 次后打开，reset_timeout 秒后放行一次试探请求，
+    试探成功则关闭，失败则重新打开。
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                return True
+            # half_open 期间只放行一个试探请求
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    log.warning(f"Circuit breaker '{self.name}' opened after {self.failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """按名称（通常是域名或模型名）获取进程内共享的熔断器。"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, settings.breaker_failures, settings.breaker_reset)
+        return _breakers[name]
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    for attr in ("status_code", "code"):
+        code = getattr(exc, attr, None)
+        if isinstance(code, int):
+            return code
+    response = getattr(exc, "response", None)
+    code = getattr(response, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    区分可重试与致命错误：
+    - 408/425/429 和 5xx 可重试，其余 4xx（如 404）不重试
+    - 参数、解析类错误（ValueError/TypeError/KeyError）不重试
+    - 熔断打开不重试
+    - 其他（连接失败、超时等）可重试
+    """
+    if isinstance(exc, CircuitOpenError):
+        return False
+    status = _status_code(exc)
+    if status is not None:
+        return status in (408, 425, 429) or status >= 500
+    if isinstance(exc, (ValueError, TypeError, KeyError)):
+        return False
+    return True
+
+
+def retry(times: int = 3, delay: float = 1, backoff: float = 2.0, max_delay: float = 30,
+          jitter: float = 0.5, deadline: Optional[float] = None,
+          retry_on: Callable[[BaseException], bool] = is_retryable,
+          breaker_key: Union[str, Callable, None] = None):
+    """
+    重试装饰器，同时支持普通函数和协程函数。
+
+    :param times: 最多尝试次数
+    :param delay: 首次重试前的等待秒数，之后按 backoff 指数增长，不超过 max_delay
+    :param jitter: 等待时间的随机抖动比例，避免大量请求同时重试
+    :param deadline: 单次调用（含所有重试）的总时限，超过后不再重试
+    :param retry_on: 判断异常是否可重试，不可重试的异常直接抛出
+    :param breaker_key: 熔断器名称，或接收被装饰函数参数、返回名称的函数
+    """
+    def wait_time(attempt: int) -> float:
+        base = min(max_delay, delay * (backoff ** attempt))
+        return base * (1 + random.uniform(-jitter, jitter))
 
-def retry(times=3, delay=1):
     def deco(func):
+        def resolve_breaker(args, kwargs) -> Optional[CircuitBreaker]:
+            if breaker_key is None:
+                return None
+            name = breaker_key(*args, **kwargs) if callable(breaker_key) else breaker_key
+            return get_breaker(name) if name else None
+
+        def should_stop(e, i, started, pause, breaker) -> bool:
+            retryable = retry_on(e)
+            if breaker and retryable:
+                breaker.record_failure()
+            elif breaker:
+                # 致命错误（如 404）说明对端是活的，不计入熔断
+                breaker.record_success()
+            if not retryable or i + 1 >= times:
+                return True
+            if breaker and breaker.state == "open":
+                return True
+            if deadline is not None and time.monotonic() - started + pause > deadline:
+                return True
+            log.warning(f"{func.__name__} failed (attempt {i+1}/{times}): {e}")
+            return False
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                breaker = resolve_breaker(args, kwargs)
+                started = time.monotonic()
+                for i in range(times):
+                    if breaker and not breaker.allow():
+                        raise CircuitOpenError(f"circuit '{breaker.name}' is open")
+                    try:
+                        result = await func(*args, **kwargs)
+                    except Exception as e:
+                        pause = wait_time(i)
+                        if should_stop(e, i, started, pause, breaker):
+                            raise
+                        await asyncio.sleep(pause)
+                    else:
+                        if breaker:
+                            breaker.record_success()
+                        return result
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            last_exc = None
+            breaker = resolve_breaker(args, kwargs)
+            started = time.monotonic()
             for i in range(times):
+                if breaker and not breaker.allow():
+                    raise CircuitOpenError(f"circuit '{breaker.name}' is open")
                 try:
-                    return func(*args, **kwargs)
+                    result = func(*args, **kwargs)
                 except Exception as e:
-                    last_exc = e
-                    log.warning(f"{func.__name__} failed (attempt {i+1}/{times}): {e}")
-                    sleep(delay)
-            raise last_exc
+                    pause = wait_time(i)
+                    if should_stop(e, i, started, pause, breaker):
+                        raise
+                    sleep(pause)
+                else:
+                    if breaker:
+                        breaker.record_success()
+                    return result
         return wrapper
     return deco
+
+
+_CJK = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估计 token 数：中日韩字符约 1 字 1 token，其余约 4 个字符 1 token。"""
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class TokenBucket:
+    """
+    令牌桶，按每分钟 rate 个令牌匀速补充，容量默认等于 rate。
+    acquire 采用预约方式：先扣减（允许为负）再按欠额等待，保证先来先得。
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """扣减 amount 个令牌，返回需要等待的秒数。"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+
+class RateLimiter:
+    """同时限制每分钟请求数（rpm）和每分钟 token 数（tpm），0 表示不限制。"""
+
+    def __init__(self, rpm: float = 0, tpm: float = 0):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    def acquire(self, tokens: int = 0):
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if wait > 0:
+            sleep(wait)
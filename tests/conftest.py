@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 配置在 src.config 导入时读取环境变量，必须在导入 src 之前设置
+_tmp = tempfile.mkdtemp(prefix="news-agent-test-")
+os.environ.setdefault("DB_URL", f"sqlite:///{_tmp}/news.db")
+os.environ.setdefault("LLM_PROVIDER", "fake")
+os.environ.setdefault("FAKE_LLM_LATENCY", "0")
+os.environ.setdefault("LLM_RPM", "0")
+os.environ.setdefault("HTTP_CACHE_DIR", "")
+os.environ.setdefault("PARSE_WORKERS", "0")
+os.environ.setdefault("REPORT_DIR", f"{_tmp}/reports")
+os.environ.setdefault("METRICS_FILE", "")
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import pytest
+
+from benchmarks.synthetic_site import SyntheticSite
+
+
+@pytest.fixture(scope="session")
+def site():
+    with SyntheticSite() as s:
+        yield s
+
+
+@pytest.fixture
+def fetcher():
+    from src.fetcher import Fetcher
+
+    f = Fetcher(cache=None)
+    yield f
+    f.close()
@@ -0,0 +1,53 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# db 模块导入时按 DB_URL 创建 engine，迁移要在单独的进程里对一个旧库执行
+SCRIPT = """
+import threading
+from src import db
+threads = [threading.Thread(target=db.count_news) for _ in range(8)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+print("rows", db.count_news())
+"""
+
+
+def _old_db(path: Path):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE news (id INTEGER PRIMARY KEY, title VARCHAR(1024), link VARCHAR(2048), "
+                 "published VARCHAR(128), source VARCHAR(256), text TEXT, summary TEXT, created_at DATETIME)")
+    rows = [("a", "https://example.com/a?utm_source=x"), ("a", "https://www.example.com/a"), ("b", "https://example.com/b")]
+    conn.executemany("INSERT INTO news (title, link) VALUES (?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def _run(path: Path, **env):
+    env = {**os.environ, "DB_URL": f"sqlite:///{path}", **env}
+    return subprocess.run([sys.executable, "-c", SCRIPT], cwd=ROOT, env=env, capture_output=True, text=True,
+                          timeout=60, check=True)
+
+
+def test_migration_logs_removed_duplicates(tmp_path):
+    path = tmp_path / "old.db"
+    _old_db(path)
+    out = _run(path)
+    assert "rows 2" in out.stdout
+    assert "删除 1 条重复链接（保留最早的一条）" in out.stderr
+    assert out.stderr.count("news 表迁移") == 1
+    assert sqlite3.connect(path).execute("SELECT id FROM news ORDER BY id").fetchall() == [(1,), (3,)]
+
+
+def test_migration_keeps_newest_with_update(tmp_path):
+    path = tmp_path / "old.db"
+    _old_db(path)
+    out = _run(path, DB_ON_CONFLICT="update")
+    assert "保留最新的一条" in out.stderr
+    assert sqlite3.connect(path).execute("SELECT id FROM news ORDER BY id").fetchall() == [(2,), (3,)]
@@ -0,0 +1,34 @@
+from pathlib import Path
+
+import pytest
+import yaml
+
+from src.extractor import EXTRACTORS, _lxml_supports, compare_engines, get_extractor
+from src.fetcher import parse_articles
+
+FIXTURES = Path(__file__).resolve().parent.parent / "src" / "asset" / "fixtures"
+SELECTORS = {"item": "article", "title": "h2", "summary": "p", "link_attr": "a"}
+
+
+@pytest.mark.parametrize("fx", yaml.safe_load((FIXTURES / "fixtures.yaml").read_text(encoding="utf-8")),
+                         ids=lambda fx: fx["file"])
+def test_engines_agree_on_fixtures(fx):
+    html = (FIXTURES / fx["file"]).read_text(encoding="utf-8")
+    assert compare_engines(html, fx["url"], fx["selectors"]) == []
+
+
+def test_no_bs4_reparse_when_lxml_finds_nothing(monkeypatch):
+    calls = []
+    monkeypatch.setattr(EXTRACTORS["bs4"], "extract", lambda *a: calls.append(a) or ([], None), raising=False)
+    html = "<html><head><title>t</title></head><body><div>nothing here</div></body></html>"
+    parse_articles(html, "https://example.com/", SELECTORS, "lxml")
+    assert calls == []
+
+
+def test_divergent_selector_uses_bs4_and_is_cached():
+    selectors = {**SELECTORS, "item": "div > :scope article"}
+    _lxml_supports.cache_clear()
+    assert get_extractor("lxml", selectors).name == "bs4"
+    assert get_extractor("lxml", selectors).name == "bs4"
+    assert _lxml_supports.cache_info().hits == 1
+    assert get_extractor("lxml", SELECTORS).name == "lxml"
@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+from src.fetcher import Fetcher
+
+
+def _counting(fetcher):
+    """记录 fetch_article_async 被调用的次数（即开始抓取的源数）。"""
+    calls = []
+    original = fetcher.fetch_article_async
+
+    async def wrapped(client, url, config=None):
+        calls.append(url)
+        return await original(client, url, config)
+
+    fetcher.fetch_article_async = wrapped
+    return calls
+
+
+def test_stream_backpressure_stalls_fetches(site):
+    fetcher = Fetcher(concurrency=4, cache=None)
+    calls = _counting(fetcher)
+    sources = site.sources(200, items=2, slow_every=0, huge_every=0)
+    try:
+        stream = fetcher.stream_from_sources(sources, buffer=2)
+        next(stream)
+        time.sleep(0.5)
+        # 消费者停下后，抓取最多领先 concurrency + buffer 个源
+        assert len(calls) <= 4 + 2
+        rest = list(stream)
+        assert len(rest) == 199 and len(calls) == 200
+    finally:
+        fetcher.close()
+
+
+def test_stream_early_close(site):
+    fetcher = Fetcher(concurrency=4, cache=None)
+    calls = _counting(fetcher)
+    sources = site.sources(50, items=2, slow_every=0, huge_every=0)
+    try:
+        for i, _ in enumerate(fetcher.stream_from_sources(sources, buffer=2)):
+            if i == 2:
+                break
+        assert len(calls) <= 3 + 4 + 2
+    finally:
+        fetcher.close()
+
+
+def test_astream_backpressure_stalls_fetches(site):
+    fetcher = Fetcher(concurrency=4, cache=None)
+    calls = _counting(fetcher)
+    sources = site.sources(100, items=2, slow_every=0, huge_every=0)
+
+    async def consume():
+        stream = fetcher.astream_sources(sources, buffer=2)
+        await stream.__anext__()
+        await asyncio.sleep(0.5)
+        stalled = len(calls)
+        rest = [r async for r in stream]
+        return stalled, len(rest)
+
+    try:
+        stalled, rest = asyncio.run(consume())
+        assert stalled <= 4 + 2
+        assert rest == 99 and len(calls) == 100
+    finally:
+        fetcher.close()
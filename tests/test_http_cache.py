@@ -0,0 +1,14 @@
+from src.config import settings
+from src.http_cache import HttpCache
+
+CONFIG = {"encoding": "utf-8", "selectors": {"item": "article", "title": "h2", "summary": "p", "link_attr": "a"}}
+
+
+def test_key_includes_extractor(monkeypatch):
+    url = "https://example.com/news"
+    lxml = HttpCache.make_key(url, {**CONFIG, "extractor": "lxml"})
+    bs4 = HttpCache.make_key(url, {**CONFIG, "extractor": "bs4"})
+    assert lxml != bs4
+    # 没有按源指定时取 settings.html_extractor
+    monkeypatch.setattr(settings, "html_extractor", "bs4")
+    assert HttpCache.make_key(url, CONFIG) == bs4
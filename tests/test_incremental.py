@@ -0,0 +1,21 @@
+from src.db import get_watermarks
+from src.seen import filter_incremental, commit_incremental
+
+
+def test_watermark_from_fetched_items(site, fetcher):
+    source = site.sources(1, items=5, slow_every=0, huge_every=0)[0]
+    items = fetcher.fetch_from_sources([source])
+    assert len(items) == 5
+    assert all(it.get("published") for it in items)
+
+    fresh, skipped = filter_incremental(items)
+    assert len(fresh) == 5 and skipped == 0
+
+    # 只入选了最新的一条，其余未入选的条目同样推进水位
+    commit_incremental(fresh[:1], [source["url"]], considered=fresh)
+    state = get_watermarks([source["url"]])[source["url"]]
+    assert state.last_published is not None and state.last_run_at is not None
+
+    again = fetcher.fetch_from_sources([source])
+    fresh, skipped = filter_incremental(again)
+    assert fresh == [] and skipped == 5
@@ -0,0 +1,27 @@
+from src.metrics import Registry, SIZE_BUCKETS
+
+
+def test_prometheus_output_keeps_full_precision():
+    registry = Registry()
+    hist = registry.histogram("test_response_bytes", "test", ("host",), SIZE_BUCKETS)
+    counter = registry.counter("test_total", "test")
+    hist.observe(123456789, host="h")
+    hist.observe(0.1234567891, host="h")
+    counter.inc(3)
+
+    text = registry.render_prometheus()
+    assert 'test_response_bytes_bucket{host="h",le="1048576"} 1' in text
+    assert 'test_response_bytes_bucket{host="h",le="+Inf"} 2' in text
+    assert f'test_response_bytes_sum{{host="h"}} {123456789 + 0.1234567891!r}' in text
+    assert "test_total 3\n" in text
+    assert "e+" not in text
+
+    buckets = registry.snapshot()["test_response_bytes"]["samples"][0]["buckets"]
+    assert list(buckets) == [str(b) for b in SIZE_BUCKETS]
+
+
+def test_latency_bucket_labels():
+    registry = Registry()
+    registry.histogram("test_seconds", "test").observe(0.3)
+    text = registry.render_prometheus()
+    assert 'le="0.005"' in text and 'le="2.5"' in text and 'le="60"' in text
@@ -0,0 +1,24 @@
+from datetime import datetime, timedelta, timezone
+
+from src.ranker import rank_articles, score_articles
+
+NOW = datetime(2026, 10, 18, 12, 0, tzinfo=timezone.utc)
+
+
+def test_missing_signals_are_dropped():
+    articles = [{"title": f"t{i}", "source": "a"} for i in range(3)]
+    # 没有查询、发布时间和来源权重时只剩位置，得分仍在 [0, 1] 内
+    assert score_articles(articles, now=NOW) == [1.0, 0.5, 1 / 3]
+
+
+def test_recency_from_published():
+    old = {"title": "old", "source": "a", "published": (NOW - timedelta(days=3)).isoformat()}
+    new = {"title": "new", "source": "b", "published": (NOW - timedelta(hours=1)).isoformat()}
+    unknown = {"title": "unknown", "source": "c"}
+    scores = score_articles([old, unknown, new], now=NOW)
+    assert scores[2] > scores[1] > scores[0]
+
+
+def test_source_weights():
+    articles = [{"title": "x", "source": "a"}, {"title": "x", "source": "b"}]
+    assert rank_articles(articles, source_weights={"b": 3.0}) == [1, 0]
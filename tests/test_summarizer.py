@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from src.config import settings
+from src.db import get_cached_summaries
+from src.llm import FakeChatModel, _fake_reply
+from src.summarizer import Summarizer
+from src.utils import estimate_tokens
+
+SHORT = {"title": "机器人新闻", "summary": "某公司发布了新一代协作机械臂。", "link": "https://example.com/short"}
+
+
+def _long_item(i: int = 0) -> dict:
+    text = " ".join(f"Sentence {n} of article {i} describes robot market data and new products." for n in range(800))
+    assert estimate_tokens(text) > settings.llm_escalate_tokens
+    return {"title": f"Long article {i}", "text": text, "summary": "", "link": f"https://example.com/long/{i}"}
+
+
+@pytest.fixture
+def models(monkeypatch):
+    monkeypatch.setattr(settings, "summary_cache", False)
+    monkeypatch.setattr(settings, "llm_cascade", True)
+    return FakeChatModel(), FakeChatModel()
+
+
+@pytest.mark.parametrize("batch_size", [1, 2])
+def test_long_article_goes_to_strong_model(models, batch_size):
+    fast, strong = models
+    summarizer = Summarizer(model="strong", llm=strong, fast_model="fast", fast_llm=fast)
+    items = [_long_item(), dict(SHORT)] if batch_size > 1 else [_long_item()]
+    out = summarizer.batch_summarize(items, concurrency=1, batch_size=batch_size)
+    assert all(it["summary_generated"] for it in out)
+    assert strong.calls == 1 and fast.calls == 0
+
+
+def test_short_article_stays_on_fast_model(models):
+    fast, strong = models
+    summarizer = Summarizer(model="strong", llm=strong, fast_model="fast", fast_llm=fast)
+    summarizer.batch_summarize([dict(SHORT)], concurrency=1, batch_size=1)
+    assert fast.calls == 1 and strong.calls == 0
+
+
+def test_summarize_uses_cache(monkeypatch):
+    monkeypatch.setattr(settings, "summary_cache", True)
+    llm = FakeChatModel()
+    summarizer = Summarizer(llm=llm)
+    item = {"title": "缓存测试", "summary": "单篇摘要也应写入并读取摘要缓存。", "link": "https://example.com/cached"}
+    first = summarizer.summarize(item["title"], item["summary"], item["link"])
+    calls = llm.calls
+    assert summarizer.summarize(item["title"], item["summary"], item["link"]) == first
+    assert llm.calls == calls
+    # 与 batch_summarize 共用同一份缓存
+    summarizer.batch_summarize([dict(item)], concurrency=1, batch_size=1)
+    assert llm.calls == calls
+
+
+def test_empty_batch_summary_is_retried_not_cached(monkeypatch):
+    monkeypatch.setattr(settings, "summary_cache", True)
+
+    def responder(prompt: str) -> str:
+        reply = _fake_reply(prompt)
+        if "用 index 标明新闻编号" in prompt:
+            data = json.loads(reply)
+            data[-1]["summary"] = ""
+            reply = json.dumps(data, ensure_ascii=False)
+        return reply
+
+    summarizer = Summarizer(llm=FakeChatModel(responder=responder))
+    items = [{"title": f"空摘要 {i}", "summary": f"第 {i} 条原文，模型对最后一条返回空摘要。", "link": f"https://example.com/empty/{i}"}
+             for i in range(2)]
+    keys = [summarizer.cache_key(it) for it in items]
+    summarizer.batch_summarize(items, concurrency=1, batch_size=2)
+    assert all(it["summary_generated"] for it in items)
+    cached = get_cached_summaries(keys)
+    assert set(cached) == set(keys) and all(summary for summary, _ in cached.values())